@@ -0,0 +1,84 @@
+"""
+Benchmarks classify_block against the old block_to_block_type, which
+stripped the block, matched uncompiled patterns and split the block into
+lines up to three times, after which each renderer split it again.
+
+    python3 bench/bench_blocks.py [--pages N] [--mix lists=6,headings=1]
+
+Only classification and line splitting are timed; inline markdown is
+rendered the same way by both.
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from block_markdown import markdown_to_blocks, classify_block, BlockType, ORDERED_ITEM_PATTERN
+from synthetic_site import parse_mix, synthetic_page
+
+
+def legacy_block_to_block_type(block):
+    # what block_to_block_type did before classify_block
+    block = block.strip()
+    if re.match(r"^#{1,6}\s+", block):
+        return BlockType.HEADING
+    if block.startswith("```") and block.endswith("```"):
+        return BlockType.CODE
+    lines = [line.strip() for line in block.split("\n") if line.strip()]
+    if lines and all(line.startswith(">") for line in lines):
+        return BlockType.QUOTE
+    if lines and all(line.startswith(("* ", "- ")) for line in lines):
+        return BlockType.UNORDERED_LIST
+    if lines and all(re.match(r"^\d+\.\s+", line) for line in lines):
+        return BlockType.ORDERED_LIST
+    return BlockType.PARAGRAPH
+
+
+def legacy_lines(block, block_type):
+    # the second split each renderer used to do, down to the item text
+    if block_type == BlockType.ORDERED_LIST:
+        return [re.match(r"^\d+\.\s+(.*)$", line.strip()).group(1)
+                for line in block.split("\n") if line.strip()]
+    if block_type == BlockType.UNORDERED_LIST:
+        return [line.strip()[2:] for line in block.split("\n") if line.strip()]
+    return [line.strip() for line in block.split("\n") if line.strip()]
+
+
+def legacy(blocks):
+    for block in blocks:
+        legacy_lines(block, legacy_block_to_block_type(block))
+
+
+def single_pass(blocks):
+    for block in blocks:
+        block_type, lines = classify_block(block)
+        # the renderers' remaining per-line work
+        if block_type == BlockType.ORDERED_LIST:
+            [ORDERED_ITEM_PATTERN.match(line).group(2) for line in lines]
+        elif block_type == BlockType.UNORDERED_LIST:
+            [line[2:] for line in lines]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark block classification on list-heavy pages.")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=40)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("lists=6,headings=1,emphasis=1"))
+    args = parser.parse_args()
+
+    blocks = []
+    for index in range(args.pages):
+        blocks.extend(markdown_to_blocks(synthetic_page(index, args.paragraphs, args.mix, args.pages)))
+    assert [legacy_block_to_block_type(block) for block in blocks] == [classify_block(block)[0] for block in blocks]
+
+    old = min(timeit.repeat(lambda: legacy(blocks), number=5, repeat=3)) / 5
+    new = min(timeit.repeat(lambda: single_pass(blocks), number=5, repeat=3)) / 5
+    print(f"{len(blocks)} blocks: legacy {old * 1e3:8.2f} ms  single pass {new * 1e3:8.2f} ms  "
+          f"speedup {old / new:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Times every stage of the build over a synthetic content tree and prints
+the results as JSON, so runs can be compared over time.
+
+    python3 bench/bench_build.py [--pages N] [--paragraphs N] [--mix lists=3,code=1] [--io-limit N] [--output FILE]
+
+Stages are timed separately on each page: markdown_to_blocks,
+block_to_block_type, text_to_textnodes, markdown_to_html_node (the whole
+parse), to_html, template fill and file write. A full
+generate_pages_recursive run is timed as well, and again through the
+asyncio I/O pipeline with --io-limit in-flight reads and writes.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from block_markdown import markdown_to_blocks, block_to_block_type, BlockType
+from block_to_html_node import markdown_to_html_node
+from generate_page import BuildOptions, collect_pages, extract_title, generate_pages_recursive
+from inline_markdown import text_to_textnodes
+from template import Template
+from synthetic_site import DEFAULT_MIX, parse_mix, write_site
+
+STAGES = ("markdown_to_blocks", "block_to_block_type", "text_to_textnodes",
+          "markdown_to_html_node", "to_html", "template_fill", "file_write")
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "total_s": sum(samples),
+        "mean_ms": 1e3 * sum(samples) / len(samples),
+        "p50_ms": 1e3 * samples[len(samples) // 2],
+        "max_ms": 1e3 * samples[-1],
+    }
+
+
+def time_stages(pages, template, base_path):
+    timings = {stage: [] for stage in STAGES}
+    clock = time.perf_counter
+
+    for source_path, dest_path in pages:
+        with open(source_path) as f:
+            markdown = f.read()
+
+        start = clock()
+        blocks = markdown_to_blocks(markdown)
+        timings["markdown_to_blocks"].append(clock() - start)
+
+        start = clock()
+        types = [block_to_block_type(block) for block in blocks]
+        timings["block_to_block_type"].append(clock() - start)
+
+        # the inline text the renderers hand to text_to_textnodes
+        inline_texts = [" ".join(block.split("\n")) for block, block_type in zip(blocks, types)
+                        if block_type != BlockType.CODE]
+        start = clock()
+        for text in inline_texts:
+            text_to_textnodes(text)
+        timings["text_to_textnodes"].append(clock() - start)
+
+        start = clock()
+        node = markdown_to_html_node(markdown)
+        timings["markdown_to_html_node"].append(clock() - start)
+
+        start = clock()
+        html = node.to_html(template.rewrite_url)
+        timings["to_html"].append(clock() - start)
+
+        start = clock()
+        page = template.render(Title=extract_title(markdown), Content=html)
+        timings["template_fill"].append(clock() - start)
+
+        start = clock()
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        with open(dest_path, 'w') as f:
+            f.write(page)
+        timings["file_write"].append(clock() - start)
+
+    return {stage: summarize(samples) for stage, samples in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the build stages on a synthetic site.")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--paragraphs", type=int, default=12)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument("--base-path", default="/static-website/")
+    parser.add_argument("--io-limit", type=int, default=8,
+                        help="in-flight reads and writes for the async pipeline build")
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        content_dir = write_site(root, args.pages, args.paragraphs, args.mix)
+        template_path = os.path.join(root, "template.html")
+        template = Template.from_file(template_path, args.base_path)
+        pages = collect_pages(content_dir, os.path.join(root, "stages"))
+        content_bytes = sum(os.path.getsize(source) for source, _ in pages)
+
+        stages = time_stages(pages, template, args.base_path)
+
+        # the real pipeline end to end, with its progress output silenced
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+        try:
+            start = time.perf_counter()
+            generate_pages_recursive(content_dir, template_path, os.path.join(root, "docs"), args.base_path)
+            full_build_s = time.perf_counter() - start
+            start = time.perf_counter()
+            generate_pages_recursive(content_dir, template_path, os.path.join(root, "docs-async"), args.base_path,
+                                     options=BuildOptions(io_limit=args.io_limit))
+            async_build_s = time.perf_counter() - start
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+    results = {
+        "config": {
+            "pages": len(pages),
+            "paragraphs": args.paragraphs,
+            "mix": args.mix,
+            "base_path": args.base_path,
+            "content_bytes": content_bytes,
+            "io_limit": args.io_limit,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+        },
+        "stages": stages,
+        "full_build_s": full_build_s,
+        "async_build_s": async_build_s,
+    }
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Measures what HTML escaping costs the serializer on code-heavy pages,
+against the same trees serialized without escaping (as it was before).
+
+    python3 bench/bench_escape.py [--pages N]
+
+Two sets of pages are timed: synthetic pages whose code blocks have no
+characters to escape (the fast path), and the same pages with "<" and
+"&&" added to every code line (the slow path). Each is timed serializing
+prebuilt trees, and parsing plus serializing as a build does.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from htmlnode import HTMLNode, LeafNode
+from block_to_html_node import markdown_to_html_node
+from synthetic_site import parse_mix, synthetic_page
+
+
+def unescaped_leaf_to_html(self, rewrite_url=None, minify=False):
+    # LeafNode.to_html before escaping (minify is not benchmarked)
+    if not self.tag:
+        return self.value
+    return f"<{self.tag}{self.props_to_html(rewrite_url)}>{self.value}</{self.tag}>"
+
+
+def unescaped_props_to_html(self, rewrite_url=None):
+    # HTMLNode.props_to_html before escaping
+    if not self.props:
+        return ""
+    attributes = ""
+    for key, val in self.props.items():
+        if rewrite_url is not None and key in ("href", "src"):
+            val = rewrite_url(val)
+        attributes += f' {key}="{val}"'
+    return attributes
+
+
+def serialize(trees):
+    for tree in trees:
+        tree.to_html()
+
+
+def render(markdown):
+    for page in markdown:
+        markdown_to_html_node(page).to_html()
+
+
+def best_of(function, *args):
+    return min(timeit.repeat(lambda: function(*args), number=10, repeat=7)) / 10
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML escaping on code-heavy pages.")
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("code=4,emphasis=1,links=1"))
+    args = parser.parse_args()
+
+    pages = [synthetic_page(index, 12, args.mix, args.pages) for index in range(args.pages)]
+    sets = {
+        "no special characters": pages,
+        "'<' and '&&' in all code": [page.replace("    step_", "    if a < b && step_") for page in pages],
+    }
+
+    leaf_to_html, props_to_html = LeafNode.to_html, HTMLNode.props_to_html
+    for name, markdown in sets.items():
+        trees = [markdown_to_html_node(page) for page in markdown]
+        escaped = best_of(serialize, trees), best_of(render, markdown)
+        LeafNode.to_html, HTMLNode.props_to_html = unescaped_leaf_to_html, unescaped_props_to_html
+        try:
+            unescaped = best_of(serialize, trees), best_of(render, markdown)
+        finally:
+            LeafNode.to_html, HTMLNode.props_to_html = leaf_to_html, props_to_html
+        for stage, before, after in zip(("to_html", "parse + to_html"), unescaped, escaped):
+            print(f"{name:<28}{stage:<17} unescaped {before * 1e3:8.2f} ms  escaped {after * 1e3:8.2f} ms  "
+                  f"overhead {100 * (after - before) / before:5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
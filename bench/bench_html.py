@@ -0,0 +1,92 @@
+"""
+Benchmarks ParentNode.to_html / write_html against the old recursive
+string-concatenation serializer on large documents.
+
+    python3 bench/bench_html.py
+"""
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from htmlnode import LeafNode, ParentNode
+
+
+def legacy_to_html(node):
+    # the serializer ParentNode.to_html used before write_html: recursion
+    # plus repeated string concatenation
+    if not isinstance(node, ParentNode):
+        return node.to_html()
+    html_string = f"<{node.tag}{node.props_to_html()}>"
+    for child in node.children:
+        html_string += legacy_to_html(child)
+    html_string += f"</{node.tag}>"
+    return html_string
+
+
+def wide_document(paragraphs):
+    # a long page: many paragraphs with inline formatting and links
+    children = []
+    for i in range(paragraphs):
+        children.append(ParentNode("p", [
+            LeafNode("", f"Paragraph {i} has some "),
+            LeafNode("b", "bold"),
+            LeafNode("", " text and a "),
+            LeafNode("a", "link", {"href": f"/blog/{i}"}),
+            LeafNode("", ". " * 20),
+        ]))
+    return ParentNode("div", children)
+
+
+def nested_document(depth, paragraphs):
+    # sections nested inside sections: the old serializer recopied every
+    # level's finished string into its parent, O(depth x size)
+    node = wide_document(paragraphs)
+    for _ in range(depth):
+        node = ParentNode("section", [wide_document(paragraphs), node])
+    return node
+
+
+def deep_document(depth):
+    node = LeafNode("", "bottom")
+    for _ in range(depth):
+        node = ParentNode("div", [node])
+    return node
+
+
+def time_it(func, number):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def main():
+    for paragraphs in (1_000, 10_000, 50_000):
+        doc = wide_document(paragraphs)
+        number = max(1, 20_000 // paragraphs)
+        legacy = time_it(lambda: legacy_to_html(doc), number)
+        joined = time_it(lambda: doc.to_html(), number)
+        streamed = time_it(lambda: doc.write_html(io.StringIO()), number)
+        size = len(doc.to_html())
+        print(f"wide  {paragraphs:>6} paragraphs ({size / 1e6:.1f} MB): "
+              f"legacy {legacy * 1e3:8.2f} ms  to_html {joined * 1e3:8.2f} ms  "
+              f"write_html {streamed * 1e3:8.2f} ms")
+
+    for depth in (10, 100, 300):
+        doc = nested_document(depth, 50)
+        legacy = time_it(lambda: legacy_to_html(doc), 3)
+        joined = time_it(lambda: doc.to_html(), 3)
+        print(f"nested {depth:>5} sections: legacy {legacy * 1e3:8.2f} ms  to_html {joined * 1e3:8.2f} ms")
+
+    for depth in (500, 5_000, 50_000):
+        doc = deep_document(depth)
+        try:
+            legacy = f"{time_it(lambda: legacy_to_html(doc), 3) * 1e3:8.2f} ms"
+        except RecursionError:
+            legacy = "RecursionError"
+        joined = time_it(lambda: doc.to_html(), 3)
+        print(f"deep  {depth:>6} levels: legacy {legacy:>14}  to_html {joined * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
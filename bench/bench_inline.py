@@ -0,0 +1,59 @@
+"""
+Benchmarks the single-pass text_to_textnodes against the old chain of
+split_nodes_image, split_nodes_link and four split_nodes_delimiter passes.
+
+    python3 bench/bench_inline.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from inline_markdown import split_nodes_delimiter, split_nodes_image, split_nodes_link, text_to_textnodes
+from textnode import TextNode, TextType
+
+
+def chained_text_to_textnodes(text):
+    # what text_to_textnodes did before the single-pass scanner
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    return nodes
+
+
+def paragraph(spans):
+    # a paragraph mixing links, images, bold, italic and code spans
+    pieces = []
+    for i in range(spans):
+        kind = i % 5
+        if kind == 0:
+            pieces.append(f"see [post {i}](/blog/post-{i})")
+        elif kind == 1:
+            pieces.append(f"with **bold {i}** words")
+        elif kind == 2:
+            pieces.append(f"and _italic {i}_ too")
+        elif kind == 3:
+            pieces.append(f"run `cmd --{i}` now")
+        else:
+            pieces.append(f"![figure {i}](/images/{i}.png)")
+    return " then ".join(pieces)
+
+
+def main():
+    for spans in (10, 100, 1_000, 5_000):
+        text = paragraph(spans)
+        assert chained_text_to_textnodes(text) == text_to_textnodes(text)
+        number = max(1, 20_000 // spans)
+        chained = min(timeit.repeat(lambda: chained_text_to_textnodes(text), number=number, repeat=3)) / number
+        single = min(timeit.repeat(lambda: text_to_textnodes(text), number=number, repeat=3)) / number
+        print(f"{spans:>5} spans ({len(text):>7} chars): chained {chained * 1e3:9.3f} ms  "
+              f"single pass {single * 1e3:9.3f} ms  speedup {chained / single:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
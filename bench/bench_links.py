@@ -0,0 +1,80 @@
+"""
+Measures what the link check adds to a build: collecting links while
+pages are rendered, and resolving them all against the built site.
+
+    python3 bench/bench_links.py [--pages N] [--paragraphs N]
+
+A synthetic link-heavy site is built into temporary directories with
+link collection switched off (as before) and on, alternately, keeping the
+best time of each, and check_links is then timed over the manifest. The defaults
+give about 50,000 links.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import generate_page
+from generate_page import generate_pages_recursive
+from link_check import check_links
+from manifest import BuildManifest
+from synthetic_site import parse_mix, write_site
+
+
+def build(content_dir, template_path, dest_dir):
+    # the pipeline's progress output isn't part of the report
+    manifest = BuildManifest(os.path.join(dest_dir, ".manifest.json"))
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        start = time.perf_counter()
+        generate_pages_recursive(content_dir, template_path, dest_dir, "/", manifest)
+        return time.perf_counter() - start, manifest
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark link collection and checking.")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--paragraphs", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("links=3,images=1,lists=1,emphasis=1"))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        content_dir = write_site(root, args.pages, args.paragraphs, args.mix)
+        template_path = os.path.join(root, "template.html")
+
+        # alternate the two builds and keep the best of each
+        parse_page = generate_page.parse_page
+        before = after = float("inf")
+        for run in range(args.repeat):
+            # parse without a links list, so nothing is collected
+            generate_page.parse_page = (lambda from_path, profiler=None, markdown=None, links=None, terms=None:
+                                        parse_page(from_path, profiler, markdown, None, terms))
+            try:
+                seconds, _ = build(content_dir, template_path, os.path.join(root, f"plain{run}"))
+                before = min(before, seconds)
+            finally:
+                generate_page.parse_page = parse_page
+            seconds, manifest = build(content_dir, template_path, os.path.join(root, f"checked{run}"))
+            after = min(after, seconds)
+
+        start = time.perf_counter()
+        broken = check_links(manifest, os.path.join(root, f"checked{args.repeat - 1}"), os.path.join(root, "static"))
+        check = time.perf_counter() - start
+
+    links = sum(len(entry["links"]) for entry in manifest.pages.values())
+    print(f"{len(manifest.pages)} pages, {links} links ({len(broken)} broken)")
+    print(f"build without collection {before:7.3f} s  with collection {after:7.3f} s  "
+          f"overhead {100 * (after - before) / before:5.1f}%")
+    print(f"check_links {check * 1e3:8.2f} ms  ({100 * check / after:4.1f}% of the build)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Measures the memory held by the node trees of a synthetic 10k-page site,
+comparing the slotted TextNode/HTMLNode classes with the old dict-backed
+ones (reproduced below).
+
+Each variant runs in its own subprocess, so the peak RSS figures are not
+mixed up.
+
+    python3 bench/bench_memory.py [--pages N]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from block_to_html_node import markdown_to_html_node
+from inline_markdown import text_to_textnodes
+from synthetic_site import synthetic_page
+
+
+# --- the node classes as they were before __slots__ ---
+
+class LegacyHTMLNode:
+    def __init__(self, tag="", value="", children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = list(children) if children is not None else []
+        self.props = props if props is not None else {}
+
+
+class LegacyLeafNode(LegacyHTMLNode):
+    def __init__(self, tag, value="", props=None):
+        super().__init__(tag, value, [], props)
+
+
+class LegacyParentNode(LegacyHTMLNode):
+    def __init__(self, tag, children, props=None):
+        super().__init__(tag, "", children, props)
+
+
+class LegacyTextNode:
+    def __init__(self, text, text_type, url=""):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+def to_legacy(node):
+    if node.children:
+        return LegacyParentNode(node.tag, [to_legacy(child) for child in node.children],
+                                dict(node.props) or None)
+    return LegacyLeafNode(node.tag, node.value, dict(node.props) or None)
+
+
+def measure(variant, pages):
+    """
+    Builds and keeps the trees (and inline TextNodes) for every page, then
+    returns the traced memory and the process's peak RSS.
+    """
+    sources = [synthetic_page(i) for i in range(pages)]
+    tracemalloc.start()
+    trees = []
+    text_nodes = []
+    for markdown in sources:
+        tree = markdown_to_html_node(markdown)
+        nodes = text_to_textnodes(markdown.replace("\n", " "))
+        if variant == "legacy":
+            tree = to_legacy(tree)
+            nodes = [LegacyTextNode(n.text, n.text_type, n.url) for n in nodes]
+        trees.append(tree)
+        text_nodes.append(nodes)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "variant": variant,
+        "pages": pages,
+        "retained_bytes": current,
+        "traced_peak_bytes": peak,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=10_000)
+    parser.add_argument("--variant", choices=("slotted", "legacy"))
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(measure(args.variant, args.pages)))
+        return
+
+    results = {}
+    for variant in ("legacy", "slotted"):
+        out = subprocess.run([sys.executable, __file__, "--variant", variant, "--pages", str(args.pages)],
+                             check=True, capture_output=True, text=True).stdout
+        results[variant] = json.loads(out)
+
+    for variant, result in results.items():
+        print(f"{variant:>8}: retained {result['retained_bytes'] / 2**20:7.1f} MiB  "
+              f"traced peak {result['traced_peak_bytes'] / 2**20:7.1f} MiB  "
+              f"peak RSS {result['max_rss_kb'] / 1024:7.1f} MiB")
+    legacy, slotted = results["legacy"], results["slotted"]
+    print(f"retained tree memory reduced by "
+          f"{100 * (1 - slotted['retained_bytes'] / legacy['retained_bytes']):.0f}%, "
+          f"peak RSS by {100 * (1 - slotted['max_rss_kb'] / legacy['max_rss_kb']):.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Reports the bytes --minify saves on every page of the site, raw and
+gzipped, by building it twice into temporary directories.
+
+    python3 bench/bench_minify.py [--content DIR] [--template FILE] [--pages N]
+
+By default the site's own content/ and template.html are measured; with
+--pages N a synthetic content tree of N pages is used instead.
+"""
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from generate_page import BuildOptions, collect_pages, generate_pages_recursive
+from synthetic_site import DEFAULT_MIX, write_site
+
+
+def build(content_dir, template_path, dest_dir, minify):
+    # the pipeline's progress output isn't part of the report
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        generate_pages_recursive(content_dir, template_path, dest_dir, options=BuildOptions(minify=minify))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def sizes(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return len(data), len(gzip.compress(data, compresslevel=9, mtime=0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the bytes saved by minifying the site.")
+    parser.add_argument("--content", default=os.path.join(ROOT, "content"))
+    parser.add_argument("--template", default=os.path.join(ROOT, "template.html"))
+    parser.add_argument("--pages", type=int, help="measure a synthetic site of this many pages instead")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        content_dir, template_path = args.content, args.template
+        if args.pages:
+            content_dir = write_site(root, args.pages, 12, DEFAULT_MIX)
+            template_path = os.path.join(root, "template.html")
+
+        plain_dir, minified_dir = os.path.join(root, "plain"), os.path.join(root, "minified")
+        build(content_dir, template_path, plain_dir, minify=False)
+        build(content_dir, template_path, minified_dir, minify=True)
+
+        totals = [0, 0, 0, 0]
+        print(f"{'page':<40}{'bytes':>10}{'minified':>10}{'saved':>8}{'gzip':>8}{'min+gzip':>10}")
+        for _, plain in collect_pages(content_dir, plain_dir):
+            minified = os.path.join(minified_dir, os.path.relpath(plain, plain_dir))
+            (raw, raw_gz), (small, small_gz) = sizes(plain), sizes(minified)
+            for i, size in enumerate((raw, small, raw_gz, small_gz)):
+                totals[i] += size
+            if not args.pages:
+                print(f"{os.path.relpath(plain, plain_dir):<40}{raw:>10}{small:>10}"
+                      f"{100 * (raw - small) / raw:>7.1f}%{raw_gz:>8}{small_gz:>10}")
+
+        raw, small, raw_gz, small_gz = totals
+        print(f"{'total':<40}{raw:>10}{small:>10}{100 * (raw - small) / raw:>7.1f}%{raw_gz:>8}{small_gz:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Measures what the search index adds to a build and how big it gets.
+
+    python3 bench/bench_search.py [--pages N] [--paragraphs N]
+
+A synthetic site is built into temporary directories with and without
+counting search terms, keeping the best of --repeat runs of each, and the
+index is then written from the manifest. Reported are the build times,
+the time to write the index, its total compressed size and the size of
+an average shard, which is what a browser fetches per query term.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from generate_page import BuildOptions, generate_pages_recursive
+from manifest import BuildManifest
+from search_index import SEARCH_DIR, write_search_index
+from synthetic_site import DEFAULT_MIX, write_site
+
+
+def build(content_dir, template_path, dest_dir, index_terms):
+    # the pipeline's progress output isn't part of the report
+    manifest = BuildManifest(os.path.join(dest_dir, ".manifest.json"))
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        start = time.perf_counter()
+        generate_pages_recursive(content_dir, template_path, dest_dir, "/", manifest,
+                                 BuildOptions(index_terms=index_terms))
+        return time.perf_counter() - start, manifest
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark building the client-side search index.")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--paragraphs", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        content_dir = write_site(root, args.pages, args.paragraphs, DEFAULT_MIX)
+        template_path = os.path.join(root, "template.html")
+
+        before = after = float("inf")
+        for run in range(args.repeat):
+            seconds, _ = build(content_dir, template_path, os.path.join(root, f"plain{run}"), False)
+            before = min(before, seconds)
+            seconds, manifest = build(content_dir, template_path, os.path.join(root, f"indexed{run}"), True)
+            after = min(after, seconds)
+
+        dest_dir = os.path.join(root, f"indexed{args.repeat - 1}")
+        start = time.perf_counter()
+        stats = write_search_index(manifest, dest_dir)
+        write = time.perf_counter() - start
+
+        directory = os.path.join(dest_dir, SEARCH_DIR)
+        sizes = [os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+                 if name.endswith(".json.gz")]
+        index_size = os.path.getsize(os.path.join(directory, "index.json"))
+
+    print(f"{len(manifest.pages)} pages, {stats['written']} shards")
+    print(f"build without terms {before:7.3f} s  with terms {after:7.3f} s  "
+          f"overhead {100 * (after - before) / before:5.1f}%")
+    print(f"write_search_index {write * 1e3:8.2f} ms")
+    print(f"index.json {index_size / 1024:8.1f} KiB  shards {sum(sizes) / 1024:8.1f} KiB gzipped, "
+          f"{sum(sizes) / len(sizes) / 1024:6.1f} KiB on average")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Generates synthetic markdown pages and content trees for the benchmarks.
+
+    python3 bench/synthetic_site.py OUTPUT_DIR [--pages N] [--mix lists=3,code=1]
+"""
+import argparse
+import os
+import random
+
+# relative weights of each markdown feature in a generated page
+DEFAULT_MIX = {
+    "headings": 1,
+    "lists": 1,
+    "code": 1,
+    "links": 1,
+    "images": 1,
+    "emphasis": 1,
+}
+
+WORDS = ("elves", "ring", "mountain", "river", "shadow", "council", "road", "song",
+         "forest", "tower", "journey", "hobbit", "wizard", "king", "sword", "light")
+
+
+def parse_mix(text):
+    """
+    Parses "lists=3,code=1" into a feature weight dict; features not named
+    get weight 0.
+    """
+    mix = dict.fromkeys(DEFAULT_MIX, 0)
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name not in mix:
+            raise ValueError(f"Unknown markdown feature: {name}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def _sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _block(kind, i, rng, pages):
+    if kind == "headings":
+        return f"{'#' * rng.randint(2, 4)} Section {i} about the {rng.choice(WORDS)}"
+    if kind == "lists":
+        if rng.random() < 0.5:
+            return "\n".join(f"- {_sentence(rng, 6)}" for _ in range(rng.randint(3, 8)))
+        return "\n".join(f"{n}. {_sentence(rng, 6)}" for n in range(1, rng.randint(4, 9)))
+    if kind == "code":
+        body = "\n".join(f"    step_{n}(\"{rng.choice(WORDS)}\")" for n in range(rng.randint(2, 8)))
+        return f"```\ndef run():\n{body}\n```"
+    if kind == "links":
+        return (f"{_sentence(rng)} Read [post {i}](/blog/post-{rng.randrange(pages)}) "
+                f"or the [source](https://example.com/{rng.choice(WORDS)}). {_sentence(rng)}")
+    if kind == "images":
+        return f"![{rng.choice(WORDS)} figure](/images/figure-{rng.randrange(20)}.png)"
+    # emphasis
+    return (f"{_sentence(rng, 6)} **{rng.choice(WORDS)} {rng.choice(WORDS)}** and "
+            f"_{rng.choice(WORDS)}_ with `{rng.choice(WORDS)}()` {_sentence(rng, 6)}")
+
+
+def synthetic_page(index, paragraphs=12, mix=None, pages=1000):
+    """
+    Returns the markdown for one synthetic blog post. The same arguments
+    always give the same page.
+    """
+    mix = mix or DEFAULT_MIX
+    kinds = [kind for kind, weight in mix.items() if weight > 0]
+    weights = [mix[kind] for kind in kinds]
+    rng = random.Random(index)
+
+    blocks = [f"# Synthetic post {index}"]
+    for i in range(paragraphs):
+        kind = rng.choices(kinds, weights)[0] if kinds else "emphasis"
+        blocks.append(_block(kind, i, rng, pages))
+    return "\n\n".join(blocks) + "\n"
+
+
+def write_site(root, pages, paragraphs=12, mix=None):
+    """
+    Writes a site in the repo's layout under root: content/index.md,
+    content/blog/post-N/index.md, template.html and static/index.css.
+    Returns the content directory.
+    """
+    content_dir = os.path.join(root, "content")
+    os.makedirs(content_dir, exist_ok=True)
+
+    with open(os.path.join(content_dir, "index.md"), 'w') as f:
+        links = "\n".join(f"- [Post {i}](/blog/post-{i})" for i in range(min(pages, 50)))
+        f.write(f"# Synthetic site\n\n{links}\n")
+
+    for i in range(pages):
+        post_dir = os.path.join(content_dir, "blog", f"post-{i}")
+        os.makedirs(post_dir, exist_ok=True)
+        with open(os.path.join(post_dir, "index.md"), 'w') as f:
+            f.write(synthetic_page(i, paragraphs, mix, pages))
+
+    os.makedirs(os.path.join(root, "static"), exist_ok=True)
+    with open(os.path.join(root, "static", "index.css"), 'w') as f:
+        f.write("body { font-family: serif; }\n")
+
+    repo_template = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "template.html")
+    with open(repo_template) as src, open(os.path.join(root, "template.html"), 'w') as dst:
+        dst.write(src.read())
+    return content_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic content tree.")
+    parser.add_argument("output")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--paragraphs", type=int, default=12)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    args = parser.parse_args()
+    write_site(args.output, args.pages, args.paragraphs, args.mix)
+    print(f"Wrote {args.pages} pages to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:  # not on Windows
+    fcntl = None
+
+from manifest import hash_file, remove_output
+
+# how changed files are transferred into the output directory
+SYNC_MODES = ("copy", "hardlink", "reflink")
+
+# hex digits of the content hash put in fingerprinted names, name.<hash>.ext
+FINGERPRINT_LENGTH = 10
+
+# ioctl request that clones a file's extents (btrfs, xfs and friends)
+FICLONE = 0x40049409
+
+
+def _is_unchanged(src, dst, mode):
+    """
+    Returns True if dst already holds src's contents. Size and mtime are
+    checked first; only when the sizes match but the mtimes differ are the
+    files hashed, and then the mtime is fixed so the next check is cheap.
+    """
+    if not os.path.exists(dst):
+        return False
+    if mode == "hardlink" and os.path.samefile(src, dst):
+        return True
+
+    src_stat, dst_stat = os.stat(src), os.stat(dst)
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if src_stat.st_mtime_ns == dst_stat.st_mtime_ns:
+        return True
+    if hash_file(src) != hash_file(dst):
+        return False
+    os.utime(dst, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+    return True
+
+
+def _clone_file(src, dst):
+    """
+    Copies src to dst with a reflink when the filesystem supports it, then
+    os.copy_file_range (an in-kernel copy), then a plain copy.
+    """
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                return "reflinked"
+            except OSError:
+                pass
+        if hasattr(os, "copy_file_range"):
+            try:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+                return "copied"
+            except OSError:
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+        shutil.copyfileobj(fsrc, fdst)
+        return "copied"
+
+
+def _transfer(src, dst, mode):
+    """
+    Puts src's contents at dst using the given sync mode, falling back to a
+    copy when a link or clone is not possible. Returns what was done.
+    """
+    if mode == "hardlink":
+        tmp = dst + ".tmp-link"
+        try:
+            os.link(src, tmp)
+            os.replace(tmp, dst)
+            return "linked"
+        except OSError:
+            # e.g. a different filesystem; copy instead
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    elif mode == "reflink":
+        if os.path.islink(dst) or os.path.exists(dst):
+            os.remove(dst)
+        action = _clone_file(src, dst)
+        shutil.copystat(src, dst)
+        return action
+
+    if os.path.exists(dst) and os.stat(dst).st_nlink > 1:
+        # don't write through a hard link into the source tree
+        os.remove(dst)
+    shutil.copy2(src, dst)
+    return "copied"
+
+
+def _is_fingerprint_of(path, dst):
+    """
+    Returns True if path is a fingerprinted name for dst, i.e. dst with a
+    content hash inserted before the extension.
+    """
+    root, ext = os.path.splitext(dst)
+    digest = path[len(root) + 1:len(path) - len(ext)]
+    return (path.startswith(root + ".") and path.endswith(ext) and len(digest) == FINGERPRINT_LENGTH and
+            all(c in "0123456789abcdef" for c in digest))
+
+
+def _fingerprinted_path(src, dst, previous, mode):
+    """
+    Returns dst renamed to name.<hash>.ext after src's contents. The last
+    build's output is reused without hashing when it is still up to date.
+    """
+    if previous is not None and _is_fingerprint_of(previous, dst) and _is_unchanged(src, previous, mode):
+        return previous
+    root, ext = os.path.splitext(dst)
+    return f"{root}.{hash_file(src)[:FINGERPRINT_LENGTH]}{ext}"
+
+
+def fingerprinted_urls(manifest, src_dir, dst_dir):
+    """
+    Returns {static URL: fingerprinted URL} for every asset the manifest
+    records under a fingerprinted name, e.g. {"/index.css":
+    "/index.3f2a9c1b04.css"}, for the page and template URL rewriting.
+    """
+    urls = {}
+    for src, dst in manifest.assets.items():
+        if os.path.commonpath([src, src_dir]) != os.path.normpath(src_dir):
+            continue
+        if os.path.basename(src) != os.path.basename(dst):
+            url = "/" + os.path.relpath(src, src_dir).replace(os.sep, "/")
+            urls[url] = "/" + os.path.relpath(dst, dst_dir).replace(os.sep, "/")
+    return urls
+
+
+def sync_assets(src_dir, dst_dir, manifest, mode="copy", fingerprint=False):
+    """
+    Mirrors the static directory into the output directory, only touching
+    files that changed, and removes outputs whose static source is gone.
+
+    mode is "copy" (shutil.copy2), "hardlink" (os.link, so unchanged trees
+    cost no data I/O at all) or "reflink" (copy-on-write clone, falling back
+    to os.copy_file_range). Returns a dict counting what was done.
+
+    With fingerprint, each file is published as name.<hash>.ext instead, so
+    it can be cached forever; fingerprinted_urls() gives the names to link
+    to, and an output whose name changed is removed.
+    """
+    if mode not in SYNC_MODES:
+        raise ValueError(f"Unknown asset sync mode: {mode}")
+
+    stats = {"copied": 0, "linked": 0, "reflinked": 0, "unchanged": 0}
+    seen = []
+    for dirpath, dirnames, filenames in os.walk(src_dir):
+        dirnames.sort()
+        out_dir = os.path.join(dst_dir, os.path.relpath(dirpath, src_dir))
+        os.makedirs(out_dir, exist_ok=True)
+        for name in sorted(filenames):
+            src = os.path.join(dirpath, name)
+            dst = os.path.normpath(os.path.join(out_dir, name))
+            previous = manifest.assets.get(src)
+            if fingerprint:
+                dst = _fingerprinted_path(src, dst, previous, mode)
+            manifest.record_asset(src, dst)
+            seen.append(src)
+
+            if _is_unchanged(src, dst, mode):
+                stats["unchanged"] += 1
+            else:
+                action = _transfer(src, dst, mode)
+                stats[action] += 1
+                print(f"{action.capitalize()} file '{src}' to '{dst}'.")
+            # e.g. the file changed and so did its fingerprint
+            if previous is not None and previous != dst:
+                remove_output(previous, dst_dir)
+
+    # anything synced last time but not seen this time was deleted from static/
+    stats["removed"] = len(manifest.remove_stale_assets(seen, dst_dir))
+    return stats
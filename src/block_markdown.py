@@ -1,14 +1,70 @@
+def read_blocks(lines, starts=None):
+    """
+    Lazily yields the blocks of a markdown document from an iterable of
+    lines, such as an open file, so the whole document never has to be in
+    memory at once.
+
+    Blocks are separated by blank lines. Lines of ordinary blocks are
+    stripped. A line starting with ``` opens a code block, ending the block
+    before it if there is one, which runs until the closing ``` line,
+    blank lines included, and keeps its indentation for code_to_html_node.
+
+    If a starts list is given, the 1-based line number each block starts on
+    is appended to it just before the block is yielded.
+    """
+    block_lines = []
+    in_fence = False
+    start = 0
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        stripped = line.strip()
+
+        if in_fence:
+            block_lines.append(line)
+            if stripped.startswith("```"):
+                in_fence = False
+                if starts is not None:
+                    starts.append(start)
+                yield "\n".join(block_lines).strip()
+                block_lines = []
+            continue
+
+        if not stripped:
+            # a blank line ends the current block
+            if block_lines:
+                if starts is not None:
+                    starts.append(start)
+                yield "\n".join(block_lines)
+                block_lines = []
+            continue
+
+        if stripped.startswith("```"):
+            # the lines before a fence, e.g. "Example:", are a block of their own
+            if block_lines:
+                if starts is not None:
+                    starts.append(start)
+                yield "\n".join(block_lines)
+            start = number
+            block_lines = [line]
+            # a fence closed on its own line, e.g. ```code```, is already complete
+            in_fence = not (len(stripped) > 3 and stripped.endswith("```"))
+            continue
+
+        if not block_lines:
+            start = number
+
+        block_lines.append(stripped)
+
+    if block_lines:
+        if starts is not None:
+            starts.append(start)
+        yield "\n".join(block_lines).strip()
+
 def markdown_to_blocks(markdown_text):
     """
     splits a markdown string into a list of blocks
     """
-    blocks = markdown_text.split("\n\n")
-    cleaned_blocks = []
-    for block in blocks:
-        if block == "":
-            continue
-        cleaned_blocks.append(block.strip())
-    return cleaned_blocks
+    return list(read_blocks(markdown_text.split("\n")))
 
 from enum import Enum
 
@@ -23,30 +79,49 @@ class BlockType(Enum):
 
 import re
 
-def block_to_block_type(block):
+HEADING_PATTERN = re.compile(r"#{1,6}\s")
+ORDERED_ITEM_PATTERN = re.compile(r"(\d+)\.\s+(.*)")
+
+def classify_block(block):
+    """
+    Returns (BlockType, lines) for a block, splitting it into lines once so
+    the renderers in block_to_html_node can reuse them. lines are the
+    block's stripped, non-blank lines, except for code blocks, whose lines
+    keep their indentation.
+
+    An ordered list must be numbered 1, 2, 3... in order.
+    """
     block = block.strip()  # Remove leading/trailing whitespace from the whole block
-    
-    # check for heading
-    if re.match(r"^#{1,6}\s+", block):
-        return BlockType.HEADING
-    
+
     # check for code block (triple backticks)
     if block.startswith("```") and block.endswith("```"):
-        return BlockType.CODE
-    
-    lines = [line.strip() for line in block.split("\n") if line.strip()]
-
-    # check for quote (lines starting with >)
-    if lines and all(line.startswith(">") for line in lines):
-        return BlockType.QUOTE
-    
-    # check for unordered list (lines starting with * or -)
-    if lines and all(line.startswith(("* ", "- ")) for line in lines):
-        return BlockType.UNORDERED_LIST
-    
-    # check for ordered list (lines starting with 1., 2., etc.)
-    if lines and all(re.match(r"^\d+\.\s+", line) for line in lines):
-        return BlockType.ORDERED_LIST
-    
-    # default to paragraph
-    return BlockType.PARAGRAPH
\ No newline at end of file
+        return BlockType.CODE, block.split("\n")
+
+    # check quote, unordered and ordered list markers in the same pass
+    lines = []
+    quote = unordered = ordered = True
+    for line in block.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        if quote:
+            quote = line.startswith(">")
+        if unordered:
+            unordered = line.startswith(("* ", "- "))
+        if ordered:
+            match = ORDERED_ITEM_PATTERN.match(line)
+            ordered = match is not None and int(match.group(1)) == len(lines) + 1
+        lines.append(line)
+
+    if block.startswith("#") and HEADING_PATTERN.match(block):
+        return BlockType.HEADING, lines
+    if lines and quote:
+        return BlockType.QUOTE, lines
+    if lines and unordered:
+        return BlockType.UNORDERED_LIST, lines
+    if lines and ordered:
+        return BlockType.ORDERED_LIST, lines
+    return BlockType.PARAGRAPH, lines
+
+def block_to_block_type(block):
+    return classify_block(block)[0]
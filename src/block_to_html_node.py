@@ -1,33 +1,133 @@
 from htmlnode import HTMLNode, LeafNode, ParentNode
-from block_markdown import markdown_to_blocks, block_to_block_type, BlockType
+from block_markdown import read_blocks, classify_block, BlockType, ORDERED_ITEM_PATTERN
 from inline_markdown import text_to_textnodes
+from search_index import count_terms
 
+from functools import lru_cache
 from typing import List
-import re
-
-def text_to_children(text) -> List[HTMLNode]:
-    "Converts raw text with inline markdown to a list of HTMLNode children."
-    text_nodes = text_to_textnodes(text)
-    children: List[HTMLNode] = []
-    for text_node in text_nodes:
-        children.append(text_node.text_node_to_html_node())
+
+# how many distinct inline fragments (list items, link lists, footers...)
+# text_to_children remembers; 0 turns the memoization off
+INLINE_CACHE_SIZE = 4096
+# longer texts are almost never repeated, so they aren't worth keeping
+INLINE_CACHE_MAX_TEXT = 512
+
+# the leaves that reference other files, and the attribute holding the URL
+LINK_ATTRIBUTES = {"a": "href", "img": "src"}
+
+def _inline_specs(text):
+    """
+    Tokenizes inline markdown into a tuple of (tag, value, props items)
+    tuples and a tuple of the offsets of its links and images in text.
+    Unlike the nodes built from it, the result is immutable, so it is safe
+    to share between callers.
+    """
+    specs = []
+    positions = []
+    for text_node in text_to_textnodes(text, positions):
+        node = text_node.text_node_to_html_node()
+        specs.append((node.tag, node.value, tuple(node.props.items())))
+    return tuple(specs), tuple(positions)
+
+_cached_inline_specs = lru_cache(maxsize=INLINE_CACHE_SIZE)(_inline_specs)
+
+def set_inline_cache_size(maxsize):
+    """
+    Replaces the inline memoization with an empty one holding up to maxsize
+    fragments, or turns it off when maxsize is 0.
+    """
+    global _cached_inline_specs
+    _cached_inline_specs = lru_cache(maxsize=maxsize)(_inline_specs) if maxsize > 0 else None
+
+def inline_cache_size():
+    "Returns the current inline memoization size, 0 when it is off."
+    return _cached_inline_specs.cache_info().maxsize if _cached_inline_specs is not None else 0
+
+def inline_cache_stats():
+    "Returns (hits, misses) of the inline memoization in this process."
+    if _cached_inline_specs is None:
+        return 0, 0
+    info = _cached_inline_specs.cache_info()
+    return info.hits, info.misses
+
+class InlineCollector:
+    """
+    Gathers what the site indexes need from a page's inline text while it
+    is turned into nodes, so the finished tree isn't walked again: with a
+    links list, every link and image as [line, tag, url], and with a terms
+    dict, the {term: count} of the text outside code spans (see
+    search_index.count_terms). start is the line the block being rendered
+    starts on.
+    """
+
+    def __init__(self, links=None, terms=None):
+        self.links = links
+        self.terms = terms
+        self.start = 0
+
+    def add(self, children, positions, lines=None, first=0):
+        """
+        Takes the nodes made from a text and the offsets of its links and
+        images in it. The text is lines joined by one-character separators,
+        lines[0] being line first of the block; without lines the text is
+        all on that line.
+        """
+        if self.links is not None and positions:
+            offsets = iter(positions)
+            index = 0
+            end = len(lines[0]) if lines else 0
+            for node in children:
+                attribute = LINK_ATTRIBUTES.get(node.tag)
+                if attribute is None:
+                    continue
+                # offsets only grow, so the line is found by walking forward
+                offset = next(offsets)
+                while lines and offset > end and index + 1 < len(lines):
+                    index += 1
+                    end += 1 + len(lines[index])
+                self.links.append([self.start + first + index, node.tag, node.props[attribute]])
+        if self.terms is not None:
+            for node in children:
+                if node.tag != "code" and node.value:
+                    count_terms(node.value, self.terms)
+
+def text_to_children(text, collect=None, lines=None, first=0) -> List[HTMLNode]:
+    """
+    Converts raw text with inline markdown to a list of HTMLNode children,
+    handing them to an InlineCollector if one is given, along with the
+    lines and first line the text came from (see InlineCollector.add).
+
+    Tokenizing is memoized on the raw text, but fresh nodes (and props
+    dicts) are built on every call, so callers may mutate what they get.
+    """
+    if _cached_inline_specs is None or len(text) > INLINE_CACHE_MAX_TEXT:
+        positions = [] if collect is not None else None
+        children = [text_node.text_node_to_html_node() for text_node in text_to_textnodes(text, positions)]
+    else:
+        specs, positions = _cached_inline_specs(text)
+        children = [LeafNode(tag, value, dict(props) if props else None) for tag, value, props in specs]
+    if collect is not None:
+        collect.add(children, positions, lines, first)
     return children
 
 
-def paragraph_to_html_node(block):
-    # Clean up whitespace and join lines with spaces
-    text = ' '.join(line.strip() for line in block.split('\n') if line.strip())
-    if not text.strip():
+# The renderers take the lines classify_block split the block into: the
+# stripped, non-blank lines, or for code blocks the raw lines, and the
+# page's InlineCollector, if any.
+
+def paragraph_to_html_node(lines, collect=None):
+    # join lines with spaces
+    text = ' '.join(lines)
+    if not text:
         return None  # Skip empty paragraphs
-    children = text_to_children(text)
-    if not children and text.strip():
+    children = text_to_children(text, collect, lines)
+    if not children:
         # If no children but we have text, create a text node
         children = [LeafNode("", text)]
-    elif not children:
-        return None
-    return ParentNode("p", list(children))
+    return ParentNode("p", children)
 
-def heading_to_html_node(block):
+def heading_to_html_node(lines, collect=None):
+    block = "\n".join(lines)
     # count the "#" to determine heading level
     level = 0
     while block[level] == "#":
@@ -38,13 +138,12 @@ def heading_to_html_node(block):
     
     # remove the leading "#" and space
     text = block[level+1:].strip()
-    children = text_to_children(text)
+    children = text_to_children(text, collect, text.split("\n") if collect is not None else None)
     return ParentNode(f"h{level}", children)
 
-def code_to_html_node(block):
+def code_to_html_node(lines, collect=None):
     # code blocks are special: no inline markdown processing
     # Remove the backticks but preserve internal whitespace
-    lines = block.split('\n')
     
     # Find and remove the opening ``` line
     start_index = 0
@@ -79,78 +178,70 @@ def code_to_html_node(block):
     code_child = LeafNode("code", text)
     return ParentNode("pre", [code_child])
 
-def quote_to_html_node(block):
-    lines = block.split("\n")
+def quote_to_html_node(lines, collect=None):
     # remove the leading "> " from each line and join them
     new_lines = []
     for line in lines:
         new_lines.append(line.lstrip("> ").strip())
     text = " ".join(new_lines)
-    children = text_to_children(text)
+    children = text_to_children(text, collect, new_lines)
     return ParentNode("blockquote", children)
 
-def ulist_to_html_node(block):
-    list_items = []
-    lines = block.split("\n")
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        # Remove the leading "* " or "- " 
-        if line.startswith("* "):
-            item_text = line[2:]
-        elif line.startswith("- "):
-            item_text = line[2:]
-        else:
-            continue
-        item_children = text_to_children(item_text)
-        if not item_children:
-            # Create a text node if no children
-            item_children = [LeafNode("", item_text)]
-        list_items.append(ParentNode("li", list(item_children)))
-
-    return ParentNode("ul", list_items)
-
-def olist_to_html_node(block):
-    list_items = []
-    lines = block.split("\n")
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        # Remove the leading "1. ", "2. ", etc.
-        match = re.match(r"^\d+\.\s+(.*)$", line)
-        if match:
-            item_text = match.group(1)
-            item_children = text_to_children(item_text)
-            if not item_children:
-                # Create a text node if no children
-                item_children = [LeafNode("", item_text)]
-            list_items.append(ParentNode("li", list(item_children)))
-    return ParentNode("ol", list_items)
-
-def markdown_to_html_node(markdown_text):
-    blocks = markdown_to_blocks(markdown_text)
+def list_item_to_html_node(item_text, collect=None, line=0):
+    item_children = text_to_children(item_text, collect, None, line)
+    if not item_children:
+        # Create a text node if no children
+        item_children = [LeafNode("", item_text)]
+    return ParentNode("li", item_children)
+
+def ulist_to_html_node(lines, collect=None):
+    # Remove the leading "* " or "- " 
+    return ParentNode("ul", [list_item_to_html_node(line[2:], collect, index) for index, line in enumerate(lines)])
+
+def olist_to_html_node(lines, collect=None):
+    # Remove the leading "1. ", "2. ", etc.
+    return ParentNode("ol", [list_item_to_html_node(ORDERED_ITEM_PATTERN.match(line).group(2), collect, index)
+                             for index, line in enumerate(lines)])
+
+BLOCK_RENDERERS = {
+    BlockType.PARAGRAPH: paragraph_to_html_node,
+    BlockType.HEADING: heading_to_html_node,
+    BlockType.CODE: code_to_html_node,
+    BlockType.QUOTE: quote_to_html_node,
+    BlockType.UNORDERED_LIST: ulist_to_html_node,
+    BlockType.ORDERED_LIST: olist_to_html_node,
+}
+
+def markdown_to_html_node(markdown_text, links=None, starts=None, terms=None):
+    """
+    Converts markdown to a single "div" ParentNode. markdown_text is either
+    a string or an iterable of blocks, e.g. read_blocks() over an open file,
+    which is consumed one block at a time.
+
+    If a links list is given, every link and image is appended to it as
+    [line, "a" or "img", url] while the blocks are rendered. For an
+    iterable of blocks, line numbers need the starts list read_blocks
+    filled in; without it they are 0.
+
+    If a terms dict is given, the search terms of the page's text are
+    counted into it as the inline text is tokenized (see InlineCollector).
+    """
+    if isinstance(markdown_text, str):
+        starts = []
+        blocks = read_blocks(markdown_text.split("\n"), starts)
+    else:
+        blocks = markdown_text
+    collect = InlineCollector(links, terms) if links is not None or terms is not None else None
     children = []
 
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        node = None
-        if block_type == BlockType.PARAGRAPH:
-            node = paragraph_to_html_node(block)
-        elif block_type == BlockType.HEADING:
-            node = heading_to_html_node(block)
-        elif block_type == BlockType.CODE:
-            node = code_to_html_node(block)
-        elif block_type == BlockType.QUOTE:
-            node = quote_to_html_node(block)
-        elif block_type == BlockType.UNORDERED_LIST:
-            node = ulist_to_html_node(block)
-        elif block_type == BlockType.ORDERED_LIST:
-            node = olist_to_html_node(block)
-        
+    for index, block in enumerate(blocks):
+        # classify and split the block once, then hand the lines to its renderer
+        block_type, lines = classify_block(block)
+        if collect is not None:
+            collect.start = starts[index] if starts else 0
+        node = BLOCK_RENDERERS[block_type](lines, collect)
         if node is not None:
             children.append(node)
     
     # wrap all the block nodes in a single "div"
-    return ParentNode("div", children)
\ No newline at end of file
+    return ParentNode("div", children)
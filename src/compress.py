@@ -0,0 +1,91 @@
+import gzip
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import brotli
+except ImportError:  # optional, only .gz sidecars are written without it
+    brotli = None
+
+from manifest import remove_output, write_output
+
+# outputs worth precompressing; images are compressed already
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".svg")
+
+
+def _compressors():
+    """
+    Returns {sidecar extension: function compressing bytes} for the formats
+    available here.
+    """
+    # mtime=0 so the same input always gives the same .gz bytes
+    compressors = {".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressors[".br"] = lambda data: brotli.compress(data, quality=11)
+    return compressors
+
+
+def _compress_file(path):
+    """
+    Writes the sidecars of one output that are missing or out of date and
+    returns how many were written. A sidecar gets its source's mtime, which
+    is how it is recognised as up to date next time.
+    """
+    source_mtime = os.stat(path).st_mtime_ns
+    data = None
+    written = 0
+    for extension, compress in _compressors().items():
+        sidecar = path + extension
+        try:
+            if os.stat(sidecar).st_mtime_ns == source_mtime:
+                continue
+        except FileNotFoundError:
+            pass
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        write_output(sidecar, compress(data))
+        os.utime(sidecar, ns=(source_mtime, source_mtime))
+        written += 1
+    return written
+
+
+def compress_outputs(directory, jobs=1):
+    """
+    Writes precompressed .gz sidecars (and .br when the brotli module is
+    installed) next to every HTML, CSS, JS and SVG file under directory, so
+    the host can serve them without compressing on each request. Sidecars
+    already up to date are skipped, and those whose output is gone are
+    removed. With jobs > 1 the files are compressed in worker processes.
+
+    Returns a dict counting the sidecars written, the files left unchanged
+    and the sidecars removed.
+    """
+    extensions = tuple(_compressors())
+    paths = []
+    removed = 0
+    # bottom up, so directories emptied by removing sidecars can be pruned
+    for dirpath, dirnames, filenames in os.walk(directory, topdown=False):
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                paths.append(path)
+            elif name.endswith((".gz", ".br")) and name[:-3].endswith(COMPRESSIBLE_EXTENSIONS):
+                # a sidecar of a deleted output, or of a format no longer written
+                if not os.path.exists(path[:-3]) or not name.endswith(extensions):
+                    remove_output(path, directory)
+                    removed += 1
+
+    paths.sort()
+    if jobs > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunksize = max(1, len(paths) // (jobs * 4))
+            written = list(executor.map(_compress_file, paths, chunksize=chunksize))
+    else:
+        written = [_compress_file(path) for path in paths]
+
+    return {
+        "compressed": sum(written),
+        "unchanged": sum(1 for count in written if count == 0),
+        "removed": removed,
+    }
@@ -1,4 +1,5 @@
-from block_to_html_node import markdown_to_html_node
+from block_markdown import read_blocks
+from block_to_html_node import markdown_to_html_node, set_inline_cache_size, inline_cache_size, inline_cache_stats
 
 def extract_title(markdown):
     """
@@ -20,61 +21,455 @@ def extract_title(markdown):
 
 
 
+import io
 import os
+import json
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import page_cache
+from manifest import hash_bytes, hash_file, stream_output, write_output
+from profiler import BuildProfiler, profile_stage
+from template import Template
+from htmlnode import escape_text
+from site_index import page_info, word_count
+from shard import partition_pages
 # Assuming markdown_to_html_node is in another file, e.g., 'block_markdown'
 # from block_markdown import markdown_to_html_node
 
-def generate_page(from_path, template_path, dest_path, base_path="/"):
+def _keep_title_block(blocks, found):
     """
-    Generates a static HTML page from a markdown file and a template.
+    Passes blocks through unchanged, saving the first block with an H1 line
+    in found so the title can be extracted without reading the file twice.
+    """
+    for block in blocks:
+        if not found and any(line.startswith("# ") for line in block.split('\n')):
+            found.append(block)
+        yield block
+
+def parse_page(from_path, profiler=None, markdown=None, links=None, terms=None):
+    """
+    Reads a markdown file and returns (title, html node tree). If the
+    file's text was already read, pass it as markdown to parse that instead.
+    If a links list is given, the page's links and images are appended to
+    it, and if a terms dict is given, its search terms are counted into it
+    (see markdown_to_html_node).
+    """
+    # Convert the markdown to a node tree block by block as the file is
+    # read, keeping the block that holds the title on the way
+    with profile_stage(profiler, "parse", from_path):
+        title_blocks = []
+        starts = []
+        if markdown is not None:
+            blocks = _keep_title_block(read_blocks(markdown.split("\n"), starts), title_blocks)
+            html_node = markdown_to_html_node(blocks, links, starts, terms)
+        else:
+            with open(from_path, 'r') as f:
+                blocks = _keep_title_block(read_blocks(f, starts), title_blocks)
+                html_node = markdown_to_html_node(blocks, links, starts, terms)
+        return extract_title(title_blocks[0] if title_blocks else ""), html_node
+
+def fill_page(stream, template, title, html_node):
+    """
+    Writes a page filled into a compiled Template to a text stream. Link and
+    image paths in the content are rewritten for the base path as they are
+    serialized.
+    """
+    # escaped like the heading's own text, so entities written in it survive
+    template.write(stream, Title=escape_text(title, keep_references=True), Content=html_node)
+
+def render_page(template, title, html_node):
+    """
+    Returns a page filled into a compiled Template as UTF-8 bytes, for the
+    async pipeline, whose workers hand finished pages to separate I/O
+    threads to write.
     """
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    stream = io.StringIO()
+    fill_page(stream, template, title, html_node)
+    return stream.getvalue().encode("utf-8")
 
-    # 1. Read the markdown and template files
-    with open(from_path, 'r') as f:
-        markdown_content = f.read()
+def write_page(template, title, html_node, dest_path, profiler=None, page=None):
+    """
+    Streams a page filled into a compiled Template to dest_path, atomically
+    and only if its bytes changed (see manifest.stream_output). Returns True
+    if the file was written.
+    """
+    with profile_stage(profiler, "write", page):
+        return stream_output(dest_path, lambda stream: fill_page(stream, template, title, html_node))
 
-    with open(template_path, 'r') as f:
-        template_content = f.read()
+def generate_page(from_path, template_path, dest_path, base_path="/", profiler=None):
+    """
+    Generates a static HTML page from a markdown file and a template.
 
-    # 2. Convert markdown to HTML and extract the title
-    html_content = markdown_to_html_node(markdown_content).to_html()
-    title = extract_title(markdown_content)
+    template_path may also be an already compiled Template, in which case the
+    base path it was compiled with is used and base_path is ignored. If a
+    BuildProfiler is given, the parse and write stages are recorded in it.
+    """
+    if isinstance(template_path, Template):
+        template = template_path
+    else:
+        template = Template.from_file(template_path, base_path)
+    print(f"Generating page from {from_path} to {dest_path} using {template.path}")
 
-    # 3. Replace placeholders in the template
-    final_html = template_content.replace("{{ Title }}", title)
-    final_html = final_html.replace("{{ Content }}", html_content)
+    # 1. Convert the markdown to a node tree and extract the title
+    title, html_node = parse_page(from_path, profiler)
 
-    # replace relative paths with the provided base_path
-    final_html = final_html.replace('href="/', f'href="{base_path}')
-    final_html = final_html.replace('src="/', f'src="{base_path}')
+    # 2. Stream the filled template to the destination path
+    write_page(template, title, html_node, dest_path, profiler, from_path)
 
-    # 4. Write the new HTML to the destination path
-    dest_dir = os.path.dirname(dest_path)
-    if not os.path.exists(dest_dir):
-        os.makedirs(dest_dir)
-    
-    with open(dest_path, 'w') as f:
-        f.write(final_html)
+def template_inputs_hash(template_path, asset_urls=None, minify=False):
+    """
+    Returns the hash the manifest records for everything besides the
+    markdown that goes into a page: the template file, the parser version,
+    whether output is minified and, when assets are fingerprinted, their
+    names, since pages link to them.
+    """
+    # PARSER_VERSION is bumped whenever the same markdown renders to
+    # different HTML, which must rebuild pages just as a template change does
+    inputs = [hash_file(template_path), page_cache.PARSER_VERSION, asset_urls or {}, minify]
+    return hash_bytes(json.dumps(inputs, sort_keys=True).encode())
 
-def generate_pages_recursive(content_dir_path, template_path, dest_dir_path, base_path="/"):
+def collect_pages(content_dir_path, dest_dir_path):
     """
-    Recursively generates HTML pages from markdown files in a content directory.
+    Walks the content directory and returns a sorted list of
+    (markdown path, html output path) pairs.
     """
-    for item in os.listdir(content_dir_path):
+    pages = []
+    for item in sorted(os.listdir(content_dir_path)):
         source_path = os.path.join(content_dir_path, item)
         dest_path = os.path.join(dest_dir_path, item)
 
         # If the item is a directory, make a recursive call
         if os.path.isdir(source_path):
-            # Create the corresponding directory in the destination
-            os.makedirs(dest_path, exist_ok=True)
-            generate_pages_recursive(source_path, template_path, dest_path, base_path)  
-        
-        # If the item is a markdown file, generate a page for it
+            pages.extend(collect_pages(source_path, dest_path))
+
+        # If the item is a markdown file, change the extension from .md to .html
         elif source_path.endswith(".md"):
-            # Change the extension from .md to .html for the destination
-            html_dest_path = os.path.splitext(dest_path)[0] + ".html"
-            
-            # Call the function from the previous lesson
-            generate_page(source_path, template_path, html_dest_path, base_path)
+            pages.append((source_path, os.path.splitext(dest_path)[0] + ".html"))
+    return pages
+
+class PageBuildError(Exception):
+    """
+    Raised after a build in which one or more pages failed. errors is a list
+    of (markdown path, message) pairs sorted by path.
+    """
+
+    def __init__(self, errors):
+        self.errors = sorted(errors)
+        lines = [f"{source}: {message}" for source, message in self.errors]
+        super().__init__(f"{len(self.errors)} page(s) failed to build:\n" + "\n".join(lines))
+
+
+class BuildOptions:
+    """
+    How generate_targets builds pages. jobs > 1 renders in that many worker
+    processes, and io_limit > 0 overlaps reading and writing with rendering
+    in an asyncio pipeline. profiler and cache are an optional BuildProfiler
+    and PageCache. asset_urls maps static URLs to fingerprinted ones,
+    shard=(i, N) builds only the i-th of N parts of the site, and
+    index_terms records each page's search terms in the manifest.
+    """
+
+    def __init__(self, jobs=1, profiler=None, cache=None, io_limit=0, asset_urls=None, minify=False,
+                 shard=None, index_terms=False):
+        self.jobs = jobs
+        self.profiler = profiler
+        self.cache = cache
+        self.io_limit = io_limit
+        self.asset_urls = asset_urls
+        self.minify = minify
+        self.shard = shard
+        self.index_terms = index_terms
+
+
+class PageJob:
+    """
+    One page to build: its markdown, its outputs as (target index, Template,
+    html path) tuples, the markdown's content hash, and what the worker
+    building it needs to know about the build.
+    """
+
+    def __init__(self, source_path, outputs, content_hash, cache=None, profile=False, index_terms=False):
+        self.source_path = source_path
+        self.outputs = outputs
+        self.content_hash = content_hash
+        self.cache = cache
+        self.profile = profile
+        self.index_terms = index_terms
+
+
+class PageResult:
+    """
+    What happened to one page: its title, word count, links and search
+    terms (None unless asked for), the error message if it failed, the
+    profile records gathered while building it, whether the parse cache had
+    it, the inline memoization hits and misses while parsing it, and how
+    many of its outputs already held the same bytes.
+    """
+
+    def __init__(self, source_path, error=None, records=(), cache_hit=False, inline_hits=0, inline_misses=0,
+                 unchanged=0, title=None, words=0, links=(), terms=None):
+        self.source_path = source_path
+        self.title = title
+        self.words = words
+        self.links = links
+        self.terms = terms
+        self.error = error
+        self.records = records
+        self.cache_hit = cache_hit
+        self.inline_hits = inline_hits
+        self.inline_misses = inline_misses
+        self.unchanged = unchanged
+
+
+def _page_content(job, result, profiler, markdown=None):
+    """
+    Returns (title, content) for a job: the cached parse when the PageCache
+    has one, else a fresh parse, which is stored for next time. The title,
+    word count, links and, if the job asks for them, search terms are also
+    kept in the PageResult.
+    """
+    source_path, cache = job.source_path, job.cache
+    template = job.outputs[0][1]
+    destinations = ", ".join(html_dest_path for _, _, html_dest_path in job.outputs)
+    page = cache.get(job.content_hash, template.minify) if cache is not None else None
+    # an entry cached without search terms can't serve a build that needs them
+    if page is not None and (page.terms is not None or not job.index_terms):
+        result.cache_hit = True
+        result.title, result.words, result.links, result.terms = page.title, page.words, page.links, page.terms
+        print(f"Generating page from {source_path} to {destinations} using {template.path} (cached parse)")
+        return page.title, page
+
+    print(f"Generating page from {source_path} to {destinations} using {template.path}")
+    hits, misses = inline_cache_stats()
+    links = []
+    terms = {} if job.index_terms else None
+    title, html_node = parse_page(source_path, profiler, markdown, links, terms)
+    result.inline_hits, result.inline_misses = (
+        after - before for after, before in zip(inline_cache_stats(), (hits, misses)))
+    result.title, result.words, result.links, result.terms = title, word_count(html_node), links, terms
+    if cache is not None:
+        # writing from the cached form is cheaper than a second tree walk
+        html_node = cache.put(job.content_hash, title, html_node, template.minify, links, terms) or html_node
+    return title, html_node
+
+def _generate_page_job(job):
+    """
+    Builds one page and returns a PageResult. Module level so it can be sent
+    to worker processes, which is also why profiling gets a fresh
+    BuildProfiler here. The page is parsed once and written to each of the
+    job's outputs.
+    """
+    profiler = BuildProfiler() if job.profile else None
+    result = PageResult(job.source_path, records=profiler.records if profiler else ())
+    try:
+        title, content = _page_content(job, result, profiler)
+        for _, template, html_dest_path in job.outputs:
+            result.unchanged += not write_page(template, title, content, html_dest_path, profiler, job.source_path)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+def _render_page_job(job, markdown):
+    """
+    Like _generate_page_job, but parses already read markdown and returns
+    (PageResult, the filled template for each output as bytes, or None on
+    failure) for the async pipeline to write.
+    """
+    profiler = BuildProfiler() if job.profile else None
+    result = PageResult(job.source_path, records=profiler.records if profiler else ())
+    try:
+        title, content = _page_content(job, result, profiler, markdown)
+        with profile_stage(profiler, "render", job.source_path):
+            html = [render_page(template, title, content) for _, template, _ in job.outputs]
+        return result, html
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+        return result, None
+
+def _read_source(source_path):
+    with open(source_path, 'rb') as f:
+        return f.read()
+
+def _stale_outputs(source_path, page_path, content_hash, targets, index_terms):
+    """
+    Returns the (target index, Template, html path) outputs of a page that
+    need building: all of them, except where a target's manifest says its
+    output is current and, if search terms are wanted, has them.
+    """
+    outputs = []
+    for index, (base_path, dest_dir_path, manifest, template, template_hash) in enumerate(targets):
+        html_dest_path = os.path.join(dest_dir_path, page_path)
+        if (manifest is not None and
+                manifest.page_is_current(source_path, content_hash, template_hash, base_path, html_dest_path) and
+                (not index_terms or source_path in manifest.terms)):
+            continue
+        outputs.append((index, template, html_dest_path))
+    return tuple(outputs)
+
+def _needs_hash(targets, cache):
+    return cache is not None or any(manifest is not None for _, _, manifest, _, _ in targets)
+
+def _job(source_path, page_path, content_hash, targets, options):
+    # None when every target's output of the page is current
+    outputs = _stale_outputs(source_path, page_path, content_hash, targets, options.index_terms)
+    if not outputs:
+        print(f"Skipping unchanged page {source_path}")
+        return None
+    return PageJob(source_path, outputs, content_hash, options.cache, options.profiler is not None,
+                   options.index_terms)
+
+async def _build_pages_async(pages, targets, options, executor):
+    """
+    Builds the pages as a pipeline: up to options.io_limit markdown files
+    are read and as many pages written at once in threads, while parsing
+    and rendering run in the executor's workers. Returns the jobs that were
+    built and their PageResults, in page order.
+    """
+    loop = asyncio.get_running_loop()
+    reads = asyncio.Semaphore(options.io_limit)
+    writes = asyncio.Semaphore(options.io_limit)
+    # bounds how many pages are held in memory between being read and written
+    in_flight = asyncio.Semaphore(2 * max(options.io_limit, options.jobs))
+
+    async def build(source_path, page_path):
+        async with in_flight:
+            return await build_page(source_path, page_path)
+
+    async def build_page(source_path, page_path):
+        async with reads:
+            data = await asyncio.to_thread(_read_source, source_path)
+        content_hash = None
+        if _needs_hash(targets, options.cache):
+            with profile_stage(options.profiler, "hash", source_path):
+                content_hash = hash_bytes(data)
+        job = _job(source_path, page_path, content_hash, targets, options)
+        if job is None:
+            return None
+
+        # decode like open(path, 'r') would, universal newlines included
+        markdown = io.TextIOWrapper(io.BytesIO(data)).read()
+        result, html = await loop.run_in_executor(executor, _render_page_job, job, markdown)
+        if html is not None:
+            async with writes:
+                with profile_stage(options.profiler, "write", source_path):
+                    try:
+                        for (_, _, html_dest_path), page_html in zip(job.outputs, html):
+                            result.unchanged += not await asyncio.to_thread(write_output, html_dest_path, page_html)
+                    except OSError as e:
+                        result.error = f"{type(e).__name__}: {e}"
+        return job, result
+
+    built = [page for page in await asyncio.gather(*(build(*page) for page in pages)) if page is not None]
+    return [job for job, _ in built], [result for _, result in built]
+
+def _run_jobs(pages, targets, options):
+    """
+    Builds the pages one job at a time, in worker processes if jobs > 1.
+    Returns the jobs that were built and their PageResults.
+    """
+    work = []
+    for source_path, page_path in pages:
+        content_hash = None
+        if _needs_hash(targets, options.cache):
+            with profile_stage(options.profiler, "hash", source_path):
+                content_hash = hash_file(source_path)
+        job = _job(source_path, page_path, content_hash, targets, options)
+        if job is not None:
+            work.append(job)
+
+    if options.jobs > 1 and len(work) > 1:
+        with ProcessPoolExecutor(max_workers=options.jobs, initializer=set_inline_cache_size,
+                                 initargs=(inline_cache_size(),)) as executor:
+            chunksize = max(1, len(work) // (options.jobs * 4))
+            return work, list(executor.map(_generate_page_job, work, chunksize=chunksize))
+    return work, [_generate_page_job(job) for job in work]
+
+def _run_pipeline(pages, targets, options):
+    """
+    Builds the pages with _build_pages_async, rendering in worker processes
+    if jobs > 1, else in one background thread.
+    """
+    if options.jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=options.jobs, initializer=set_inline_cache_size,
+                                       initargs=(inline_cache_size(),))
+    else:
+        # one thread keeps the per-page inline cache counts exact
+        executor = ThreadPoolExecutor(max_workers=1)
+    with executor:
+        return asyncio.run(_build_pages_async(pages, targets, options, executor))
+
+def generate_pages_recursive(content_dir_path, template_path, dest_dir_path, base_path="/", manifest=None,
+                             options=None):
+    """
+    Recursively generates HTML pages from markdown files in a content directory.
+
+    With a BuildManifest, unchanged pages are skipped and the manifest is
+    updated but not saved. Failed pages raise PageBuildError at the end.
+    """
+    generate_targets(content_dir_path, template_path, [(base_path, dest_dir_path, manifest)], options)
+
+def generate_targets(content_dir_path, template_path, targets, options=None):
+    """
+    Like generate_pages_recursive, for several (base path, output
+    directory, BuildManifest or None) targets, parsing each page once.
+    """
+    options = options if options is not None else BuildOptions()
+    profiler = options.profiler
+    pages = collect_pages(content_dir_path, "")
+    if options.shard is not None:
+        index, count = options.shard
+        pages = partition_pages(pages, content_dir_path, count)[index - 1]
+        print(f"Building shard {index}/{count}: {len(pages)} page(s).")
+
+    # 1. compile the template once per target
+    template_hash = None
+    if any(manifest is not None for _, _, manifest in targets):
+        template_hash = template_inputs_hash(template_path, options.asset_urls, options.minify)
+    targets = [(base_path, dest_dir_path, manifest,
+                Template.from_file(template_path, base_path, options.asset_urls, options.minify), template_hash)
+               for base_path, dest_dir_path, manifest in targets]
+
+    # 2. render the pages, leaving out outputs the manifests say are current
+    if options.io_limit > 0:
+        work, results = _run_pipeline(pages, targets, options)
+    else:
+        work, results = _run_jobs(pages, targets, options)
+
+    # 3. record what was built and collect what failed
+    errors = []
+    written = 0
+    for job, result in zip(work, results):
+        if profiler is not None:
+            profiler.merge(result.records)
+        if result.error is not None:
+            errors.append((job.source_path, result.error))
+            continue
+        written += len(job.outputs) - result.unchanged
+        for index, _, html_dest_path in job.outputs:
+            base_path, dest_dir_path, manifest, _, _ = targets[index]
+            if manifest is not None:
+                info = page_info(job.source_path, html_dest_path, dest_dir_path, result.title, result.words,
+                                 result.links)
+                manifest.record_page(job.source_path, job.content_hash, template_hash, base_path, html_dest_path,
+                                     info, result.terms)
+
+    unchanged = sum(result.unchanged for result in results if result.error is None)
+    print(f"Wrote {written} page(s), {unchanged} unchanged.")
+
+    if inline_cache_size():
+        hits = sum(result.inline_hits for result in results)
+        misses = sum(result.inline_misses for result in results)
+        print(f"Inline cache: {hits} hit(s), {misses} miss(es).")
+
+    if options.cache is not None:
+        hits = sum(result.cache_hit for result in results)
+        print(f"Parse cache: {hits} hit(s), {len(results) - hits} miss(es).")
+        options.cache.evict()
+
+    for _, dest_dir_path, manifest, _, _ in targets:
+        if manifest is not None:
+            manifest.remove_stale_pages([source for source, _ in pages], dest_dir_path)
+
+    if errors:
+        raise PageBuildError(errors)
@@ -1,23 +1,125 @@
 
 
-from typing import List, Dict, Optional
+import re
+from types import MappingProxyType
+from typing import Callable, List, Dict, Optional
+
+# attributes holding URLs that may need rewriting, e.g. for the site's base path
+URL_ATTRIBUTES = ("href", "src")
+
+# shared, immutable empty children and props, so the millions of leaves in a
+# big build don't each allocate their own empty list and dict
+EMPTY_CHILDREN = ()
+EMPTY_PROPS = MappingProxyType({})
+
+# runs of whitespace in text, collapsed to one space when minifying
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# an "&" that doesn't already start a character reference like &amp; or &#39;
+AMPERSAND_PATTERN = re.compile(r"&(?![A-Za-z][A-Za-z0-9]*;|#[0-9]+;|#[xX][0-9A-Fa-f]+;)")
+
+
+def escape_text(text: str, keep_references: bool = False) -> str:
+    """
+    Escapes &, < and > for use as element text. Text without them, which
+    is nearly all of it, is returned as is without building a new string.
+
+    With keep_references, character references the author wrote, like
+    &copy;, are left alone rather than shown literally.
+    """
+    # substring scans are much cheaper than rebuilding the string, and
+    # chained str.replace beats str.translate for multi-character escapes
+    if "&" in text:
+        text = AMPERSAND_PATTERN.sub("&amp;", text) if keep_references else text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def escape_attribute(value: str, keep_references: bool = False) -> str:
+    """
+    Escapes a value for use inside a double-quoted attribute. With
+    keep_references, character references are left alone as in
+    escape_text; URLs are escaped in full.
+    """
+    value = escape_text(value, keep_references)
+    if '"' in value:
+        value = value.replace('"', "&quot;")
+    return value
 
 class HTMLNode:
+    # slots instead of a per-instance __dict__ keep large trees compact
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag: str = "", value: str = "", children: Optional[List["HTMLNode"]] = None, props: Optional[Dict[str, str]] = None):
         self.tag = tag
         self.value = value
         self.children = list(children) if children is not None else []  # Convert to list to handle any sequence
         self.props = props if props is not None else {}
 
-    def to_html(self):
+    def __getstate__(self):
+        # the shared EMPTY_PROPS can't be pickled or deep-copied, so it
+        # travels as a plain empty dict and is restored as one
+        props = {} if self.props is EMPTY_PROPS else self.props
+        return (self.tag, self.value, self.children, props)
+
+    def __setstate__(self, state):
+        self.tag, self.value, self.children, self.props = state
+
+    def to_html(self, rewrite_url: Optional[Callable[[str], str]] = None, minify: bool = False):
         raise NotImplementedError("Subclasses should implement this method")
+
+    def write_html(self, stream, rewrite_url: Optional[Callable[[str], str]] = None, minify: bool = False):
+        """
+        Serializes the node and everything under it into stream, which may be
+        any writable text stream (an open file, io.StringIO) or a list that
+        the pieces are appended to.
+
+        The tree is walked with an explicit stack instead of recursion, so the
+        cost is linear in the output size and deeply nested trees cannot hit
+        the recursion limit.
+
+        With minify, runs of whitespace in text are collapsed to one space,
+        except inside <pre> and <code>, where whitespace is content.
+        """
+        # pieces are gathered in a list and flushed in batches, which is much
+        # cheaper than one stream.write() call per tag
+        pieces: List[str] = stream if isinstance(stream, list) else []
+        # the stack holds nodes still to write and closing tags (as strings)
+        stack: List[object] = [self]
+        while stack:
+            node = stack.pop()
+            if node.__class__ is str:
+                pieces.append(node)
+            elif minify and node.tag == "pre":
+                pieces.append(node.to_html(rewrite_url))
+            elif isinstance(node, ParentNode):
+                pieces.append(f"<{node.tag}{node.props_to_html(rewrite_url) if node.props else ''}>")
+                stack.append(f"</{node.tag}>")
+                stack.extend(reversed(node.children))
+            else:
+                pieces.append(node.to_html(rewrite_url, minify))
+            if pieces is not stream and len(pieces) >= 4096:
+                stream.write("".join(pieces))
+                pieces.clear()
+        if pieces is not stream:
+            stream.write("".join(pieces))
     
-    def props_to_html(self):
+    def props_to_html(self, rewrite_url: Optional[Callable[[str], str]] = None):
+        # rewrite_url, if given, is applied to href and src values
         if not self.props:
             return ""
         
         attributes = ""
         for key, val in self.props.items():
+            url = key in URL_ATTRIBUTES
+            if rewrite_url is not None and url:
+                val = rewrite_url(val)
+            if "&" in val or "<" in val or ">" in val or '"' in val:
+                # text like alt keeps references, as element text does
+                val = escape_attribute(val, not url)
             attributes += f' {key}="{val}"'
         return attributes
 
@@ -30,43 +132,54 @@ class HTMLNode:
                 self.props == other.props)
 
     def __repr__(self):
-        return f"HTMLNode(tag={self.tag}, value={self.value}, children={self.children}, props={self.props})"
+        return f"HTMLNode(tag={self.tag}, value={self.value}, children={list(self.children)}, props={dict(self.props)})"
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag: str, value: str = "", props: Optional[Dict[str, str]] = None):
         if value is None:  # Only reject None, not empty strings
             raise ValueError("LeafNode value cannot be None")
         if not value and tag != "img":  # Allow empty strings for img tags only
             raise ValueError("LeafNode value cannot be empty except for img tags")
-        super().__init__(tag, value, [], props)
+        # set the slots directly rather than through HTMLNode.__init__, which
+        # would copy the shared empty children into a new list
+        self.tag = tag
+        self.value = value
+        self.children = EMPTY_CHILDREN
+        self.props = props if props is not None else EMPTY_PROPS
 
-    def to_html(self):
+    def to_html(self, rewrite_url: Optional[Callable[[str], str]] = None, minify: bool = False):
+        value = self.value
+        # checked inline so text needing no escaping costs no function call;
+        # code shows references like &amp; literally, other text keeps them
+        if "&" in value or "<" in value or ">" in value:
+            value = escape_text(value, self.tag != "code")
+        if minify and self.tag != "code":
+            value = WHITESPACE_PATTERN.sub(" ", value)
         if not self.tag:
-            return self.value
-        props_html = self.props_to_html()
-        return f"<{self.tag}{props_html}>{self.value}</{self.tag}>"
+            return value
+        props_html = self.props_to_html(rewrite_url)
+        return f"<{self.tag}{props_html}>{value}</{self.tag}>"
     
     def __eq__(self, other):
         return isinstance(other, LeafNode) and super().__eq__(other)
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag: str, children: List["HTMLNode"], props: Optional[Dict[str, str]] = None):
         if not tag:
             raise ValueError("Invalid HTML: ParentNode must have a tag")
         if children is None or not children:
             raise ValueError("Invalid HTML: ParentNode must have at least one child")
-        super().__init__(tag, "", children, props)
-
-    def to_html(self):
-        # recursively builds an HTML string fromt he node and its children
-        # start with the opening tag of the parent
-        html_string = f"<{self.tag}{self.props_to_html()}>"
-        # recursively call to_html on each child and append to the string
-        for child in self.children:
-            html_string += child.to_html()
-        # close the parent tag
-        html_string += f"</{self.tag}>"
-        return html_string
+        super().__init__(tag, "", children, props if props is not None else EMPTY_PROPS)
+
+    def to_html(self, rewrite_url: Optional[Callable[[str], str]] = None, minify: bool = False):
+        # collect the pieces from the iterative serializer and join them once
+        pieces: List[str] = []
+        self.write_html(pieces, rewrite_url, minify)
+        return "".join(pieces)
     
     def __eq__(self, other):
         return isinstance(other, ParentNode) and super().__eq__(other)
@@ -113,19 +113,76 @@ def split_nodes_link(old_nodes):
             new_nodes.append(TextNode(text_to_process, TextType.TEXT))
     return new_nodes
 
-def text_to_textnodes(text):
-    # 1. start with a single node containing athe full text
-    nodes = [TextNode(text, TextType.TEXT)]
-
-    # 2. split by images, then links
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
-
-    # 3. split by bold, italic and code delimiters
-    # Process bold first (longer delimiter), then italic (both * and _), then code
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-
+IMAGE_PATTERN = re.compile(r"!\[(.*?)\]\((.*?)\)")
+LINK_PATTERN = re.compile(r"\[(.*?)\]\((.*?)\)")
+# the emphasis and code delimiters, longest first so "**" wins over "*"
+DELIMITER_PATTERN = re.compile(r"\*\*|\*|_|`")
+DELIMITER_TYPES = {
+    "**": TextType.BOLD,
+    "*": TextType.ITALIC,
+    "_": TextType.ITALIC,
+    "`": TextType.CODE,
+}
+
+
+def _scan_delimiters(text, start, end, nodes):
+    """
+    Appends the nodes for text[start:end], which contains no images or
+    links, splitting out bold, italic and code spans left to right.
+    """
+    pos = start
+    while pos < end:
+        match = DELIMITER_PATTERN.search(text, pos, end)
+        if match is None:
+            nodes.append(TextNode(text[pos:end], TextType.TEXT))
+            return
+        delimiter = match.group()
+        close = text.find(delimiter, match.end(), end)
+        if close == -1:
+            raise ValueError(f"Invalid Markdown: unclosed delimiter '{delimiter}'")
+        # don't create nodes for empty strings
+        if match.start() > pos:
+            nodes.append(TextNode(text[pos:match.start()], TextType.TEXT))
+        if close > match.end():
+            nodes.append(TextNode(text[match.end():close], DELIMITER_TYPES[delimiter]))
+        pos = close + len(delimiter)
+
+
+def _scan_links(text, start, end, nodes, positions):
+    """
+    Appends the nodes for text[start:end], which contains no images.
+    """
+    pos = start
+    for link in LINK_PATTERN.finditer(text, start, end):
+        _scan_delimiters(text, pos, link.start(), nodes)
+        if positions is not None:
+            positions.append(link.start())
+        anchor_text, url = link.groups()
+        nodes.append(TextNode(anchor_text, TextType.LINK, url=url))
+        pos = link.end()
+    _scan_delimiters(text, pos, end, nodes)
+
+
+def text_to_textnodes(text, positions=None):
+    """
+    Splits raw text with inline markdown into a list of TextNodes in a
+    single left-to-right scan. If a positions list is given, the offset in
+    text of every link and image is appended to it, in order.
+
+    Gives the same nodes as running split_nodes_image, split_nodes_link and
+    split_nodes_delimiter for "**", "*", "_" and "`" in turn, for any text
+    those passes accept: images and links are found first and delimiters
+    never pair across them. Text inside a span is kept as is, so a
+    delimiter inside a code span ("`a_b`") no longer counts as unclosed.
+    """
+    nodes = []
+    pos = 0
+    for image in IMAGE_PATTERN.finditer(text):
+        _scan_links(text, pos, image.start(), nodes, positions)
+        if positions is not None:
+            positions.append(image.start())
+        alt_text, url = image.groups()
+        nodes.append(TextNode(alt_text, TextType.IMAGE, url=url))
+        pos = image.end()
+    _scan_links(text, pos, len(text), nodes, positions)
     return nodes
@@ -0,0 +1,89 @@
+import os
+import posixpath
+from urllib.parse import unquote, urlsplit
+
+from search_index import SEARCH_DIR
+from site_index import FEED_NAME, SITEMAP_NAME
+
+# what each collected tag is called in reports
+LINK_KINDS = {"a": "link", "img": "image"}
+
+
+class BrokenLinksError(Exception):
+    """
+    Raised after a build in which pages link to files that don't exist.
+    broken is a sorted list of (markdown path, line, tag, url) tuples.
+    """
+
+    def __init__(self, broken):
+        self.broken = sorted(broken)
+        lines = [f"{source}:{line}: broken {LINK_KINDS[tag]} '{url}'" for source, line, tag, url in self.broken]
+        super().__init__(f"{len(self.broken)} broken link(s):\n" + "\n".join(lines))
+
+
+def site_paths(manifest, dest_dir, static_dir):
+    """
+    Returns the set of paths, relative to the site root, of every page and
+    static file the manifest says was built, e.g. "/blog/tom/index.html"
+    and "/images/tom.png". Static files are listed under their source
+    names, which is what the markdown links to even when they are
+    fingerprinted.
+
+    The files written after the pages (sitemap.xml, atom.xml and the
+    search index) aren't in the manifest, so the ones in dest_dir are
+    added too.
+    """
+    paths = set()
+    for entry in manifest.pages.values():
+        paths.add("/" + os.path.relpath(entry["output"], dest_dir).replace(os.sep, "/"))
+    for source in manifest.assets:
+        paths.add("/" + os.path.relpath(source, static_dir).replace(os.sep, "/"))
+    for name in (SITEMAP_NAME, FEED_NAME):
+        if os.path.isfile(os.path.join(dest_dir, name)):
+            paths.add("/" + name)
+    search_dir = os.path.join(dest_dir, SEARCH_DIR)
+    if os.path.isdir(search_dir):
+        paths.update(f"/{SEARCH_DIR}/{name}" for name in os.listdir(search_dir))
+    return paths
+
+
+def resolve_link(url, page_url):
+    """
+    Returns the site path a link on the page at page_url points to, or None
+    for links this site doesn't serve (other hosts, mailto:, bare #fragments).
+    """
+    if (url.startswith("/") and "//" not in url and "/." not in url and
+            "?" not in url and "#" not in url and "%" not in url):
+        # most links are plain site paths, nothing to split or normalize
+        return url
+    scheme, netloc, path, _, _ = urlsplit(url)
+    if scheme or netloc or not path:
+        return None
+    path = unquote(path)
+    if not path.startswith("/"):
+        path = page_url[:page_url.rindex("/") + 1] + path
+    directory = path.endswith("/")
+    path = posixpath.normpath(path)
+    return path.rstrip("/") + "/" if directory else path
+
+
+def check_links(manifest, dest_dir, static_dir):
+    """
+    Returns (markdown path, line, tag, url) for every link and image in the
+    manifest's pages whose target is neither a built page nor a static
+    file. Only the link lists recorded while rendering are used; no HTML or
+    markdown is read. A link to a directory is fine if it has an
+    index.html.
+    """
+    paths = site_paths(manifest, dest_dir, static_dir)
+    broken = []
+    for source, entry in manifest.pages.items():
+        page_url = entry.get("url") or "/"
+        for line, tag, url in entry.get("links", ()):
+            path = resolve_link(url, page_url)
+            if path is None or path in paths:
+                continue
+            if (path + "index.html" if path.endswith("/") else path + "/index.html") in paths:
+                continue
+            broken.append((source, line, tag, url))
+    return sorted(broken)
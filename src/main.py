@@ -1,61 +1,304 @@
 import os
 import sys
 import shutil
+import argparse
+import cProfile
 
-from generate_page import generate_page, generate_pages_recursive
+from assets import sync_assets, fingerprinted_urls, SYNC_MODES
+from block_to_html_node import set_inline_cache_size, INLINE_CACHE_SIZE
+from compress import compress_outputs
+from generate_page import BuildOptions, generate_targets, PageBuildError
+from link_check import BrokenLinksError, check_links
+from manifest import BuildManifest, MANIFEST_NAME
+from page_cache import PageCache
+from profiler import BuildProfiler, profile_stage
+from shard import ShardMergeError, find_shards, merge_shards, parse_shard, shard_dir
+from search_index import write_search_index
+from site_index import write_feed, write_sitemap
+from watch import watch_site
 
 
-def main():
+def parse_target(value):
+    """
+    Parses a --target value, BASE=DIR, into (base path, output directory).
+    """
+    base_path, sep, dest_dir = value.partition("=")
+    if not sep or not base_path.startswith("/") or not dest_dir:
+        raise argparse.ArgumentTypeError(f"expected BASE=DIR with BASE starting with '/', got '{value}'")
+    return base_path, dest_dir
+
+
+def parse_shard_option(value):
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the static site from content/ into docs/.")
+    parser.add_argument("base_path", nargs="?",
+                        help="path the site is served from (default: /)")
+    parser.add_argument("--target", dest="targets", action="append", type=parse_target, metavar="BASE=DIR",
+                        help="build the site for base path BASE into DIR; repeat to build several "
+                             "in one pass, parsing each page once (default: the base path into docs/)")
+    parser.add_argument("--shard", type=parse_shard_option, metavar="i/N",
+                        help="build only the i-th of N size-balanced parts of the site, into "
+                             "docs.shard-i-of-N (or DIR.shard-i-of-N for each --target)")
+    parser.add_argument("--merge", action="store_true",
+                        help="combine the shard outputs docs.shard-*-of-N into docs/ (or each --target's "
+                             "DIR), failing if shards are missing or disagree")
+    parser.add_argument("--incremental", action="store_true",
+                        help="keep docs/ and only rebuild pages and assets that changed")
+    parser.add_argument("-j", "--jobs", type=int, default=1, metavar="N",
+                        help="render pages in N worker processes (0 means one per CPU core)")
+    parser.add_argument("--io-limit", type=int, default=0, metavar="N",
+                        help="overlap reading markdown and writing pages with rendering in an asyncio "
+                             "pipeline, with at most N reads and N writes in flight (default: 0, off)")
+    parser.add_argument("--asset-mode", choices=SYNC_MODES, default="copy",
+                        help="how changed static files reach docs/: copy them, hard-link them, "
+                             "or clone them copy-on-write where the filesystem allows (default: copy)")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="publish static files as name.<hash>.ext and link to those names, "
+                             "so they can be served with long-lived cache headers")
+    parser.add_argument("--minify", action="store_true",
+                        help="minify the template and generated HTML (<pre> blocks are left as they are)")
+    parser.add_argument("--site-url", metavar="URL",
+                        help="absolute URL the site is published at, e.g. https://example.com; "
+                             "when given, sitemap.xml and an Atom feed of content/blog/ are written")
+    parser.add_argument("--search-index", action="store_true",
+                        help="write a sharded inverted index of the pages' text to docs/search/ "
+                             "for client-side search")
+    parser.add_argument("--check-links", action="store_true",
+                        help="fail the build if a page links to, or shows an image from, a path that "
+                             "is neither a generated page nor a static file")
+    parser.add_argument("--compress", action="store_true",
+                        help="write precompressed .gz (and .br, if the brotli module is installed) "
+                             "sidecars next to HTML, CSS, JS and SVG outputs")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="don't use the on-disk cache of parsed pages")
+    parser.add_argument("--cache-dir", default=os.path.join(".cache", "pages"),
+                        help="where parsed pages are cached between builds (default: .cache/pages)")
+    parser.add_argument("--cache-size", type=int, default=64, metavar="MB",
+                        help="largest the parse cache may grow before old entries are evicted (default: 64)")
+    parser.add_argument("--inline-cache", type=int, default=INLINE_CACHE_SIZE, metavar="N",
+                        help="remember the rendering of up to N repeated inline fragments per process "
+                             f"(0 turns it off, default: {INLINE_CACHE_SIZE})")
+    parser.add_argument("--watch", action="store_true",
+                        help="build, serve docs/ locally and rebuild affected pages whenever content/, "
+                             "static/ or template.html change")
+    parser.add_argument("--port", type=int, default=8888,
+                        help="port for the --watch server (default: 8888)")
+    parser.add_argument("--profile", action="store_true",
+                        help="time each build stage and page and print a report at the end")
+    parser.add_argument("--profile-output", metavar="FILE",
+                        help="also write a cProfile/pstats dump of the main process to FILE (implies --profile)")
+    args = parser.parse_args(argv)
+    if args.profile_output:
+        args.profile = True
+    if args.jobs < 0:
+        parser.error("--jobs must be 0 or a positive number")
+    if args.io_limit < 0:
+        parser.error("--io-limit must be 0 or a positive number")
+    if args.inline_cache < 0:
+        parser.error("--inline-cache must be 0 or a positive number")
+    if args.targets and args.base_path is not None:
+        parser.error("give either a base path or --target, not both")
+    if args.targets and args.watch:
+        parser.error("--watch builds a single target; give a base path instead of --target")
+    if args.shard and args.merge:
+        parser.error("--merge combines the shards once they are all built; give it without --shard")
+    if (args.shard or args.merge) and args.watch:
+        parser.error("--watch can't be combined with --shard or --merge")
+    if args.watch:
+        # the watcher rebuilds single pages in this process and has no use for these
+        ignored = [option for option, given in (
+            ("--incremental", args.incremental),
+            ("--jobs", args.jobs != 1),
+            ("--io-limit", args.io_limit),
+            ("--site-url", args.site_url),
+            ("--search-index", args.search_index),
+            ("--check-links", args.check_links),
+            ("--compress", args.compress),
+            ("--no-cache", not args.cache),
+            ("--cache-dir", args.cache_dir != parser.get_default("cache_dir")),
+            ("--cache-size", args.cache_size != parser.get_default("cache_size")),
+            ("--profile-output" if args.profile_output else "--profile", args.profile),
+        ) if given]
+        if ignored:
+            parser.error(f"--watch can't be combined with {', '.join(ignored)}")
+    if args.base_path is None:
+        args.base_path = "/"
+    if not args.targets:
+        args.targets = [(args.base_path, "docs")]
+    if len({os.path.normpath(dest_dir) for _, dest_dir in args.targets}) < len(args.targets):
+        parser.error("each --target needs its own output directory")
+    if args.jobs == 0:
+        args.jobs = os.cpu_count() or 1
+    return args
+
+
+def build_site(args, profiler=None):
     # define source and destination paths
     source_path = "static"
-    destination_path = "docs"
-
-    print(f"Preparing to copy from '{source_path}' to '{destination_path}'...")
-
-    def copy_directory_recursively(src, dst):
-        # create the destination directory if it doesn't exist
-        if not os.path.exists(dst):
-            os.makedirs(dst)
-            print(f"Created directory '{dst}'.")
-
-        # iterate over all items in the source directory
-        for item in os.listdir(src):
-            s = os.path.join(src, item)
-            d = os.path.join(dst, item)
-            
-            if os.path.isdir(s):
-                # recursively copy subdirectory
-                copy_directory_recursively(s, d)
+    manifests = []
+    outputs = [(basepath, shard_dir(dest_dir, *args.shard) if args.shard else dest_dir)
+               for basepath, dest_dir in args.targets]
+
+    for basepath, destination_path in outputs:
+        manifest_path = os.path.join(destination_path, MANIFEST_NAME)
+        print(f"Preparing to copy from '{source_path}' to '{destination_path}'...")
+
+        # 1. delete the destination directory if it exists, unless building incrementally
+        with profile_stage(profiler, "clean"):
+            if args.incremental:
+                manifest = BuildManifest.load(manifest_path)
             else:
-                # copy file
-                shutil.copy2(s, d)
-                print(f"Copied file '{s}' to '{d}'.")
-    
-    # 1. delete the destination directory if it exists
-    if os.path.exists(destination_path):
-        print(f"Deleting existing directory '{destination_path}'...")
-        shutil.rmtree(destination_path) # recursive delete
-        print(f"Deleted '{destination_path}'.")
-
-    # 2. call the recursive copy function
-    print(f"Copying contents from '{source_path}' to '{destination_path}'...")
-    copy_directory_recursively(source_path, destination_path)
-    print("Copy operation completed.")
-
-    # read base path from command line argument
-    basepath = "/"
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
-    
-    # call the generate_page function recursively
+                if os.path.exists(destination_path):
+                    print(f"Deleting existing directory '{destination_path}'...")
+                    shutil.rmtree(destination_path) # recursive delete
+                    print(f"Deleted '{destination_path}'.")
+                manifest = BuildManifest(manifest_path)
+        manifests.append(manifest)
+
+        # 2. call the recursive copy function
+        print(f"Copying contents from '{source_path}' to '{destination_path}'...")
+        with profile_stage(profiler, "copy static"):
+            stats = sync_assets(source_path, destination_path, manifest, args.asset_mode, args.fingerprint)
+        print("Copy operation completed: " + ", ".join(f"{count} {action}" for action, count in stats.items()) + ".")
+
+    # every target gets the same static files, so the same fingerprinted names
+    _, destination_path = outputs[0]
+    asset_urls = fingerprinted_urls(manifests[0], source_path, destination_path) if args.fingerprint else None
+
+    # call the generate_page function recursively, parsing each page once for all targets
     print("Generating pages from content...")
     content_dir = "content"
     template_path = "template.html"
-    dest_dir = "docs"
-    
-    generate_pages_recursive(content_dir, template_path, dest_dir, basepath)
-    
+    targets = [(basepath, dest_dir, manifest) for (basepath, dest_dir), manifest in zip(outputs, manifests)]
+
+    try:
+        cache = PageCache(args.cache_dir, args.cache_size * 2**20) if args.cache else None
+        with profile_stage(profiler, "generate pages"):
+            options = BuildOptions(jobs=args.jobs, profiler=profiler, cache=cache, io_limit=args.io_limit,
+                                   asset_urls=asset_urls, minify=args.minify, shard=args.shard,
+                                   index_terms=args.search_index)
+            generate_targets(content_dir, template_path, targets, options)
+    finally:
+        # keep what did build so the next incremental run only retries the failures
+        for manifest in manifests:
+            manifest.save()
+
+    for basepath, destination_path, manifest in targets:
+        finish_target(args, profiler, basepath, destination_path, manifest)
+
+    # links are checked before the base path is applied, so one target will do
+    _, destination_path, manifest = targets[0]
+    check_site(args, profiler, source_path, destination_path, manifest)
     print("Static site generation complete!")
-    
+
+
+def finish_target(args, profiler, basepath, destination_path, manifest):
+    """
+    Writes the search index, sitemap and feed and precompresses the
+    outputs of a built target, as asked for on the command line.
+    """
+    if args.search_index and args.shard:
+        print("Leaving the search index for --merge, which sees every page.")
+    elif args.search_index:
+        # from the term counts in the manifest; no markdown is read again
+        with profile_stage(profiler, "search index"):
+            stats = write_search_index(manifest, destination_path, basepath)
+            # keeps the ids given to newly indexed pages
+            manifest.save()
+        print("Search index: " + ", ".join(f"{count} shard(s) {action}" for action, count in stats.items()) + ".")
+
+    if args.site_url and args.shard:
+        print("Leaving sitemap.xml and atom.xml for --merge, which sees every page.")
+    elif args.site_url:
+        # from the page index in the manifest; no markdown is read again
+        path = basepath.strip("/")
+        site_url = args.site_url.rstrip("/") + "/" + (path + "/" if path else "")
+        with profile_stage(profiler, "site index"):
+            write_sitemap(manifest, destination_path, site_url)
+            write_feed(manifest, destination_path, site_url)
+        print(f"Wrote sitemap.xml and atom.xml for {site_url}.")
+
+    if args.compress:
+        with profile_stage(profiler, "compress"):
+            stats = compress_outputs(destination_path, args.jobs)
+        print("Compression completed: " + ", ".join(f"{count} {action}" for action, count in stats.items()) + ".")
+
+
+def check_site(args, profiler, static_dir, destination_path, manifest):
+    """
+    Raises BrokenLinksError if --check-links was given and a page links to
+    something that wasn't built.
+    """
+    if not args.check_links:
+        return
+    if args.shard:
+        print("Leaving the link check for --merge, which sees every page.")
+        return
+    with profile_stage(profiler, "check links"):
+        broken = check_links(manifest, destination_path, static_dir)
+    print(f"Checked {sum(len(entry.get('links', ())) for entry in manifest.pages.values())} link(s), "
+          f"{len(broken)} broken.")
+    if broken:
+        raise BrokenLinksError(broken)
+
+
+def merge_site(args, profiler=None):
+    """
+    Replaces each target's output directory with the merge of its shard
+    outputs (see shard.merge_shards).
+    """
+    for basepath, destination_path in args.targets:
+        shard_paths = find_shards(destination_path)
+        print(f"Merging {len(shard_paths)} shard(s) into '{destination_path}'...")
+        with profile_stage(profiler, "merge"):
+            # the search index's page ids outlive the tree being replaced
+            manifest_path = os.path.join(destination_path, MANIFEST_NAME)
+            manifest = BuildManifest(manifest_path, search_ids=BuildManifest.load(manifest_path).search_ids)
+            stats = merge_shards(shard_paths, destination_path, manifest)
+            manifest.save()
+        print("Merge completed: " + ", ".join(f"{count} {action}" for action, count in stats.items()) + ".")
+        finish_target(args, profiler, basepath, destination_path, manifest)
+        check_site(args, profiler, "static", destination_path, manifest)
+
+    print("Static site generation complete!")
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    set_inline_cache_size(args.inline_cache)
+
+    if args.watch:
+        watch_site("content", "template.html", "static", "docs", args.base_path, args.port, args.asset_mode,
+                   args.fingerprint, args.minify)
+        return
+
+    profiler = BuildProfiler() if args.profile else None
+    c_profile = cProfile.Profile() if args.profile_output else None
+    if c_profile is not None:
+        c_profile.enable()
+
+    try:
+        if args.merge:
+            merge_site(args, profiler)
+        else:
+            build_site(args, profiler)
+    except (PageBuildError, ShardMergeError, BrokenLinksError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if c_profile is not None:
+            c_profile.disable()
+            c_profile.dump_stats(args.profile_output)
+            print(f"Wrote cProfile stats to '{args.profile_output}'.")
+        if profiler is not None:
+            print(profiler.report())
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,231 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+# the manifest lives inside the output directory, dotfiles are not published
+MANIFEST_NAME = ".manifest.json"
+
+# the process umask, read once: mkstemp makes private files, and outputs
+# should get the mode open() would have given them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def hash_bytes(data):
+    """
+    Returns the hex sha256 digest of a bytes object.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    """
+    Returns the hex sha256 digest of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _holds(path, size, digest):
+    # the size check spares hashing files that obviously differ
+    try:
+        return os.path.getsize(path) == size and hash_file(path) == digest
+    except FileNotFoundError:
+        return False
+
+
+def _temp_output(path):
+    # exist_ok because parallel workers may create the same directory at once
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    return tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+
+
+def write_output(path, data):
+    """
+    Atomically replaces the file at path with data (bytes), through a temp
+    file in the same directory and os.replace, so readers never see a
+    half-written file.
+
+    If the file already holds exactly these bytes it is left alone, mtime
+    included, so deploy tools only see real changes. Returns True if the
+    file was written, False if it was unchanged.
+    """
+    if _holds(path, len(data), hash_bytes(data)):
+        return False
+
+    fd, tmp_path = _temp_output(path)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return True
+
+
+class _HashingFile(io.FileIO):
+    """
+    A file that keeps the sha256 digest and size of the bytes written to it.
+    """
+
+    def __init__(self, fd):
+        super().__init__(fd, 'wb')
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        written = super().write(data)
+        self.digest.update(memoryview(data)[:written])
+        self.size += written
+        return written
+
+
+def stream_output(path, write):
+    """
+    Like write_output, for text produced by calling write(stream): it is
+    encoded as UTF-8 straight into the temp file and hashed on the way, so
+    the whole file is never held in memory. If the file already held the
+    same bytes, the temp file is dropped and the file left alone. Returns
+    True if the file was written, False if it was unchanged.
+    """
+    fd, tmp_path = _temp_output(path)
+    try:
+        raw = _HashingFile(fd)
+        with io.TextIOWrapper(io.BufferedWriter(raw, 1 << 16), encoding="utf-8", newline="") as stream:
+            write(stream)
+        if _holds(path, raw.size, raw.digest.hexdigest()):
+            os.remove(tmp_path)
+            return False
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+def remove_output(path, root):
+    """
+    Deletes a generated file and prunes any directories it leaves empty,
+    stopping at the root of the output directory.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+        print(f"Removed stale output '{path}'.")
+
+    root = os.path.abspath(root)
+    directory = os.path.dirname(os.path.abspath(path))
+    while directory != root and directory.startswith(root):
+        if not os.path.isdir(directory) or os.listdir(directory):
+            break
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
+
+
+class BuildManifest:
+    """
+    Records what the last build produced so the next build can skip pages
+    whose markdown, template and base path are all unchanged.
+
+    pages maps a markdown source path to a dict with its content hash,
+    template hash, base path and output path, plus the page's metadata
+    (URL, title, source mtime, word count, links; see site_index.page_info)
+    when it was recorded. assets maps a static source path to the path it was
+    copied to.
+
+    terms maps a markdown source path to the page's {term: count}, for
+    search_index, if they were counted when it was last built. They are
+    kept apart from the build inputs, so a build without the search index
+    leaves the terms of unchanged pages for the next one that wants them.
+    search_ids is search_index's append-only table of page ids by URL.
+    """
+
+    def __init__(self, path, pages=None, assets=None, terms=None, search_ids=None):
+        self.path = path
+        self.pages = pages if pages is not None else {}
+        self.assets = assets if assets is not None else {}
+        self.terms = terms if terms is not None else {}
+        self.search_ids = search_ids if search_ids is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a manifest from disk. A missing or unreadable manifest gives an
+        empty one, which simply means everything is rebuilt.
+        """
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        return cls(path, data.get("pages", {}), data.get("assets", {}), data.get("terms", {}),
+                   data.get("search_ids", {}))
+
+    def save(self):
+        data = json.dumps({"pages": self.pages, "assets": self.assets, "terms": self.terms,
+                           "search_ids": self.search_ids}, indent=2, sort_keys=True)
+        write_output(self.path, data.encode("utf-8"))
+
+    def page_is_current(self, source, content_hash, template_hash, base_path, output):
+        """
+        Returns True if the page was last built from exactly these inputs and
+        its output is still on disk.
+        """
+        entry = self.pages.get(source)
+        if entry is None:
+            return False
+        return (entry["content_hash"] == content_hash and
+                entry["template_hash"] == template_hash and
+                entry["base_path"] == base_path and
+                entry["output"] == output and
+                os.path.exists(output))
+
+    def record_page(self, source, content_hash, template_hash, base_path, output, info=None, terms=None):
+        """
+        Records a built page. Terms counted in the same build replace the
+        page's old ones; without them the old ones are dropped, since they
+        may no longer match the page.
+        """
+        if terms is not None:
+            self.terms[source] = terms
+        else:
+            self.terms.pop(source, None)
+        self.pages[source] = {
+            "content_hash": content_hash,
+            "template_hash": template_hash,
+            "base_path": base_path,
+            "output": output,
+            **(info or {}),
+        }
+
+    def record_asset(self, source, output):
+        self.assets[source] = output
+
+    def remove_stale_pages(self, seen_sources, root):
+        """
+        Deletes the outputs of pages whose markdown source no longer exists
+        and returns their sources.
+        """
+        stale = sorted(set(self.pages) - set(seen_sources))
+        for source in stale:
+            self.terms.pop(source, None)
+            remove_output(self.pages.pop(source)["output"], root)
+        return stale
+
+    def remove_stale_assets(self, seen_sources, root):
+        """
+        Deletes copied static files whose source no longer exists and returns
+        their sources.
+        """
+        stale = sorted(set(self.assets) - set(seen_sources))
+        for source in stale:
+            remove_output(self.assets.pop(source), root)
+        return stale
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+
+from htmlnode import escape_attribute
+from manifest import write_output
+from site_index import word_count
+
+# bump whenever a change to the parser or serializer changes the HTML it
+# produces, so entries written by older code are never used
+PARSER_VERSION = "9"
+
+# marks where a URL starts and ends in a serialized body; it cannot occur
+# in the HTML of a normal page
+URL_MARK = "\0"
+
+
+class CachedPage:
+    """
+    The title, word count, links, search terms (None if they weren't
+    counted) and serialized HTML body of a parsed page.
+
+    body alternates literal HTML and the href/src URLs inside it, so the page
+    can be written for any base path without the node tree: write_html()
+    has the same signature as HTMLNode.write_html and can be passed to
+    Template.write in place of a tree. The body is already minified or not,
+    whichever it was cached as, so write_html's minify is ignored.
+    """
+
+    def __init__(self, title, body, words=0, links=(), terms=None):
+        self.title = title
+        self.body = body
+        self.words = words
+        self.links = links
+        self.terms = terms
+
+    @classmethod
+    def from_node(cls, title, html_node, minify=False, links=(), terms=None):
+        """
+        Serializes a node tree, minified if asked to, or returns None if its
+        text contains the URL mark and so can't be split reliably. links are
+        the page's links and terms its search terms, as
+        markdown_to_html_node collected them.
+        """
+        urls = []
+
+        def mark_url(url):
+            urls.append(url)
+            return URL_MARK + url + URL_MARK
+
+        body = html_node.to_html(mark_url, minify).split(URL_MARK)
+        if len(body) != 2 * len(urls) + 1:
+            return None
+        # keep the URLs unescaped, as the rewriters expect them
+        body[1::2] = urls
+        return cls(title, body, word_count(html_node), links, terms)
+
+    def write_html(self, stream, rewrite_url=None, minify=False):
+        parts = list(self.body)
+        for i in range(1, len(parts), 2):
+            url = rewrite_url(parts[i]) if rewrite_url is not None else parts[i]
+            parts[i] = escape_attribute(url)
+        if isinstance(stream, list):
+            stream.extend(parts)
+        else:
+            stream.write("".join(parts))
+
+    def to_html(self, rewrite_url=None, minify=False):
+        parts = []
+        self.write_html(parts, rewrite_url)
+        return "".join(parts)
+
+
+class PageCache:
+    """
+    An on-disk cache of parsed pages keyed by the markdown's content hash,
+    PARSER_VERSION and whether the page was minified, so unchanged markdown
+    is never parsed twice, even when the template or base path changed.
+
+    Each entry is one JSON file. Reading an entry bumps its mtime, and
+    evict() deletes the least recently used entries until the cache fits in
+    max_bytes. Entries are written atomically, so worker processes can share
+    the cache.
+    """
+
+    def __init__(self, directory, max_bytes=64 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, content_hash, minify=False):
+        key = f"{PARSER_VERSION}:{content_hash}" + (":minify" if minify else "")
+        key = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, content_hash, minify=False):
+        """
+        Returns the CachedPage for the markdown with this hash, or None.
+        """
+        path = self._path(content_hash, minify)
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return CachedPage(data["title"], data["body"], data["words"], data["links"], data["terms"])
+
+    def put(self, content_hash, title, html_node, minify=False, links=(), terms=None):
+        """
+        Stores a freshly parsed page and returns it as a CachedPage, or None
+        if it can't be cached.
+        """
+        page = CachedPage.from_node(title, html_node, minify, links, terms)
+        if page is None:
+            return None
+        data = json.dumps({"title": page.title, "body": page.body, "words": page.words, "links": page.links,
+                           "terms": page.terms})
+        write_output(self._path(content_hash, minify), data.encode())
+        return page
+
+    def evict(self):
+        """
+        Deletes least recently used entries until the cache is no larger
+        than max_bytes. Returns the number of entries deleted.
+        """
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.directory):
+            for name in filenames:
+                # skip the temp files of entries being written
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, path, stat.st_size))
+                total += stat.st_size
+
+        removed = 0
+        for _, path, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,71 @@
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class BuildProfiler:
+    """
+    Records wall time and allocation counts for each pipeline stage, per
+    page where there is one.
+
+    Allocations are the net change in sys.getallocatedblocks() over the
+    stage, which is cheap enough to leave the timings undistorted.
+    """
+
+    def __init__(self):
+        # (page or None, stage name, seconds, net allocated blocks)
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, page=None):
+        start_blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.records.append((page, name, elapsed, sys.getallocatedblocks() - start_blocks))
+
+    def merge(self, records):
+        """
+        Adds records gathered elsewhere, e.g. by a worker process.
+        """
+        self.records.extend(records)
+
+    def report(self, top=10):
+        """
+        Returns a text report of the time spent in each stage and the
+        slowest pages.
+        """
+        stages = {}
+        pages = {}
+        for page, name, seconds, blocks in self.records:
+            total = stages.setdefault(name, [0, 0.0, 0])
+            total[0] += 1
+            total[1] += seconds
+            total[2] += blocks
+            if page is not None:
+                pages.setdefault(page, {})
+                pages[page][name] = pages[page].get(name, 0.0) + seconds
+
+        lines = ["Build profile", "", f"{'stage':<24}{'calls':>8}{'total ms':>12}{'mean ms':>10}{'net allocs':>12}"]
+        for name, (calls, seconds, blocks) in sorted(stages.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name:<24}{calls:>8}{seconds * 1e3:>12.2f}{seconds * 1e3 / calls:>10.3f}{blocks:>12}")
+
+        if pages:
+            slowest = sorted(pages.items(), key=lambda item: (-sum(item[1].values()), item[0]))[:top]
+            lines += ["", f"Slowest {len(slowest)} of {len(pages)} pages"]
+            for page, page_stages in slowest:
+                breakdown = ", ".join(f"{name} {seconds * 1e3:.2f}" for name, seconds in page_stages.items())
+                lines.append(f"{sum(page_stages.values()) * 1e3:>10.2f} ms  {page}  ({breakdown})")
+        return "\n".join(lines)
+
+
+def profile_stage(profiler, name, page=None):
+    """
+    Returns profiler.stage(name, page), or a no-op context manager when
+    profiling is off.
+    """
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name, page)
@@ -0,0 +1,95 @@
+import gzip
+import json
+import os
+import re
+
+from manifest import remove_output, write_output
+
+# the index lives in <output dir>/search: index.json lists the pages and
+# the shard holding each term prefix, and each shard is gzipped JSON
+SEARCH_DIR = "search"
+# terms are sharded by their first PREFIX_LENGTH characters
+PREFIX_LENGTH = 2
+
+TERM_PATTERN = re.compile(r"[^\W_]{2,}")
+
+
+def count_terms(text, terms):
+    """
+    Adds the terms of text to the {term: count} dict terms. Terms are
+    lowercased words of two or more letters or digits.
+    """
+    for term in TERM_PATTERN.findall(text.lower()):
+        terms[term] = terms.get(term, 0) + 1
+
+
+def _shard_name(prefix):
+    # ASCII prefixes name their own file; anything else is spelled in hex
+    if prefix.isascii():
+        return f"{prefix}.json.gz"
+    return f"_{prefix.encode('utf-8').hex()}.json.gz"
+
+
+def write_search_index(manifest, root, base_path="/"):
+    """
+    Writes the inverted index of the pages in the manifest under
+    root/search, from the term counts recorded while they were rendered,
+    so nothing is parsed again.
+
+    index.json holds {"pages": [[url, title], ...], "prefix": PREFIX_LENGTH,
+    "shards": {prefix: file}}. Each shard maps its terms to flat posting
+    lists [page id, count, page id, count, ...], a page's id being its
+    position in "pages". A browser fetches index.json once and then only
+    the shards a query's prefixes need.
+
+    Page ids come from the manifest's search_ids, which only ever grows: a
+    URL keeps its id for good, so adding or removing a page rewrites just
+    the shards holding its terms. Ids of pages no longer indexed are null
+    in "pages". Save the manifest afterwards to keep new ids.
+
+    Files whose bytes didn't change are left alone and shards no longer
+    needed are removed. Returns a dict counting shards written, unchanged
+    and removed.
+    """
+    # 1. give pages indexed for the first time the next ids, in URL order
+    indexed = sorted(((manifest.pages[source]["url"], manifest.pages[source]["title"], terms)
+                      for source, terms in manifest.terms.items() if source in manifest.pages),
+                     key=lambda page: page[0])
+    ids = manifest.search_ids
+    for url, _, _ in indexed:
+        if url not in ids:
+            ids[url] = len(ids)
+
+    # 2. one posting list per term, grouped into shards by prefix
+    pages = [None] * len(ids)
+    shards = {}
+    for url, title, terms in indexed:
+        page_id = ids[url]
+        pages[page_id] = [base_path + url[1:], title]
+        for term, count in terms.items():
+            shards.setdefault(term[:PREFIX_LENGTH], {}).setdefault(term, []).extend((page_id, count))
+
+    # 3. the shards and index.json, leaving identical files alone
+    directory = os.path.join(root, SEARCH_DIR)
+    stats = {"written": 0, "unchanged": 0, "removed": 0}
+    names = {}
+    for prefix, postings in sorted(shards.items()):
+        names[prefix] = _shard_name(prefix)
+        data = json.dumps(postings, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        # mtime=0 so the same postings always give the same bytes
+        changed = write_output(os.path.join(directory, names[prefix]),
+                               gzip.compress(data.encode("utf-8"), compresslevel=9, mtime=0))
+        stats["written" if changed else "unchanged"] += 1
+
+    index = {"pages": pages, "prefix": PREFIX_LENGTH, "shards": names}
+    write_output(os.path.join(directory, "index.json"),
+                 json.dumps(index, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+    # 4. shards whose prefixes no page uses any more
+    if os.path.isdir(directory):
+        current = set(names.values()) | {"index.json"}
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".json.gz") and name not in current:
+                remove_output(os.path.join(directory, name), root)
+                stats["removed"] += 1
+    return stats
@@ -0,0 +1,169 @@
+import glob
+import heapq
+import os
+import re
+import shutil
+
+from manifest import BuildManifest, MANIFEST_NAME, hash_bytes, hash_file
+
+# shard i of N builds into <output dir>.shard-i-of-N
+SHARD_DIR_PATTERN = re.compile(r"\.shard-(\d+)-of-(\d+)$")
+
+
+class ShardMergeError(Exception):
+    """
+    Raised when shard outputs can't be merged: a shard is missing, two
+    shards wrote different files to the same path, or they were built from
+    different inputs. problems is a sorted list of messages.
+    """
+
+    def __init__(self, problems):
+        self.problems = sorted(problems)
+        super().__init__(f"{len(self.problems)} problem(s) merging shards:\n" + "\n".join(self.problems))
+
+
+def parse_shard(value):
+    """
+    Parses a shard spec "i/N" (1 <= i <= N) into (i, N).
+    """
+    match = re.fullmatch(r"(\d+)/(\d+)", value)
+    if match is None or not 1 <= int(match.group(1)) <= int(match.group(2)):
+        raise ValueError(f"expected i/N with 1 <= i <= N, got '{value}'")
+    return int(match.group(1)), int(match.group(2))
+
+
+def shard_dir(dest_dir_path, index, count):
+    """
+    Returns the output directory shard index of count builds into.
+    """
+    return f"{os.path.normpath(dest_dir_path)}.shard-{index}-of-{count}"
+
+
+def partition_pages(pages, content_dir_path, count):
+    """
+    Splits (markdown path, output path) pairs into count shards of about
+    equal total markdown size and returns them as sorted lists.
+
+    Largest pages are placed first, each on the lightest shard so far. Ties
+    are broken by a hash of the page's path relative to the content
+    directory, so every runner computes the same split from the same tree
+    whatever order the pages were listed in and wherever it is checked out.
+    """
+    weighted = []
+    for source_path, html_dest_path in pages:
+        name = os.path.relpath(source_path, content_dir_path).replace(os.sep, "/")
+        # an empty page still costs a write
+        size = max(os.path.getsize(source_path), 1)
+        weighted.append((-size, hash_bytes(name.encode("utf-8")), source_path, html_dest_path))
+    weighted.sort()
+
+    shards = [[] for _ in range(count)]
+    loads = [(0, index) for index in range(count)]
+    for negative_size, _, source_path, html_dest_path in weighted:
+        load, index = heapq.heappop(loads)
+        shards[index].append((source_path, html_dest_path))
+        heapq.heappush(loads, (load - negative_size, index))
+    return [sorted(shard) for shard in shards]
+
+
+def find_shards(dest_dir_path):
+    """
+    Returns the shard output directories of dest_dir_path in shard order,
+    raising ShardMergeError unless there is exactly one of each of 1..N.
+    """
+    found = {}
+    for path in glob.glob(glob.escape(os.path.normpath(dest_dir_path)) + ".shard-*-of-*"):
+        match = SHARD_DIR_PATTERN.search(path)
+        if match is not None and os.path.isdir(path):
+            found[int(match.group(1)), int(match.group(2))] = path
+    counts = {count for _, count in found}
+    if not found:
+        raise ShardMergeError([f"no shard outputs found for '{dest_dir_path}'"])
+    if len(counts) > 1:
+        raise ShardMergeError([f"shards of different builds found: {sorted(found.values())}"])
+    count = counts.pop()
+    missing = [f"shard {index}/{count} is missing" for index in range(1, count + 1) if (index, count) not in found]
+    if missing:
+        raise ShardMergeError(missing)
+    return [found[index, count] for index in range(1, count + 1)]
+
+
+def _shard_files(shard_path):
+    """
+    Returns the paths of the files in a shard's output relative to it,
+    leaving out its manifest.
+    """
+    files = []
+    for dirpath, dirnames, filenames in os.walk(shard_path):
+        dirnames.sort()
+        for name in sorted(filenames):
+            relative = os.path.relpath(os.path.join(dirpath, name), shard_path)
+            if relative != MANIFEST_NAME:
+                files.append(relative)
+    return files
+
+
+def _same_file(a, b):
+    return os.path.getsize(a) == os.path.getsize(b) and hash_file(a) == hash_file(b)
+
+
+def merge_shards(shard_paths, dest_dir_path, manifest):
+    """
+    Replaces dest_dir_path with the combined shard outputs and adds their
+    manifests to manifest, with output paths moved under dest_dir_path, so
+    the merged tree can be built incrementally like any other.
+
+    Files several shards wrote, such as static assets, must be identical,
+    each page must come from a single shard, and all pages must have been
+    built with the same template and base path. Everything is checked
+    before dest_dir_path is touched; any problem raises ShardMergeError.
+    Returns a dict counting the files copied and the duplicates skipped.
+    """
+    problems = []
+
+    # 1. the manifests: no page twice, one set of build inputs
+    owners = {}
+    inputs = {}
+    for shard_path in shard_paths:
+        shard_manifest = BuildManifest.load(os.path.join(shard_path, MANIFEST_NAME))
+        for source, entry in sorted(shard_manifest.pages.items()):
+            if source in owners:
+                problems.append(f"{source}: built by both {owners[source]} and {shard_path}")
+                continue
+            owners[source] = shard_path
+            inputs.setdefault((entry["template_hash"], entry["base_path"]), shard_path)
+            output = os.path.join(dest_dir_path, os.path.relpath(entry["output"], shard_path))
+            manifest.pages[source] = {**entry, "output": output}
+            if source in shard_manifest.terms:
+                manifest.terms[source] = shard_manifest.terms[source]
+        for source, output in sorted(shard_manifest.assets.items()):
+            output = os.path.join(dest_dir_path, os.path.relpath(output, shard_path))
+            if manifest.assets.setdefault(source, output) != output:
+                problems.append(f"{source}: published as both {manifest.assets[source]} and {output}")
+    if len(inputs) > 1:
+        problems.append("shards were built with different templates or base paths: " +
+                        ", ".join(sorted(set(inputs.values()))))
+
+    # 2. the files: any path written by more than one shard must match
+    sources = {}
+    duplicates = 0
+    for shard_path in shard_paths:
+        for relative in _shard_files(shard_path):
+            first = sources.setdefault(relative, shard_path)
+            if first == shard_path:
+                continue
+            duplicates += 1
+            if not _same_file(os.path.join(first, relative), os.path.join(shard_path, relative)):
+                problems.append(f"{relative}: differs between {first} and {shard_path}")
+
+    if problems:
+        raise ShardMergeError(problems)
+
+    # 3. copy, keeping mtimes so precompressed sidecars stay up to date
+    if os.path.exists(dest_dir_path):
+        shutil.rmtree(dest_dir_path)
+    for relative, shard_path in sorted(sources.items()):
+        destination = os.path.join(dest_dir_path, relative)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copy2(os.path.join(shard_path, relative), destination)
+    return {"copied": len(sources), "duplicates": duplicates}
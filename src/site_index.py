@@ -0,0 +1,116 @@
+import os
+import time
+from xml.sax.saxutils import escape
+
+from manifest import write_output
+
+# how many of the newest posts the Atom feed lists
+FEED_ENTRIES = 20
+# the files written at the root of the output directory
+SITEMAP_NAME = "sitemap.xml"
+FEED_NAME = "atom.xml"
+
+
+def page_url(output, root):
+    """
+    Returns the site URL of a generated file, relative to the base path:
+    docs/blog/tom/index.html -> "/blog/tom/", docs/about.html -> "/about.html".
+    """
+    path = os.path.relpath(output, root).replace(os.sep, "/")
+    if path == "index.html":
+        return "/"
+    if path.endswith("/index.html"):
+        return "/" + path[:-len("index.html")]
+    return "/" + path
+
+
+def word_count(html_node):
+    """
+    Counts the words in a page's text, leaving out code.
+    """
+    words = 0
+    stack = [html_node]
+    while stack:
+        node = stack.pop()
+        if node.children:
+            stack.extend(node.children)
+        elif node.tag != "code":
+            words += len(node.value.split())
+    return words
+
+
+def page_info(source_path, output, root, title, words, links=()):
+    """
+    Returns the metadata the manifest keeps for a built page, see
+    BuildManifest.record_page. Only the source is stat'ed. links are the
+    page's [line, tag, url] links, for link_check.
+    """
+    return {
+        "url": page_url(output, root),
+        "title": title,
+        "mtime": os.stat(source_path).st_mtime,
+        "words": words,
+        "links": list(links),
+    }
+
+
+def _indexed_pages(manifest):
+    # pages built before the index existed have no metadata yet
+    return sorted((entry for entry in manifest.pages.values() if "url" in entry), key=lambda entry: entry["url"])
+
+
+def _timestamp(seconds):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(seconds))
+
+
+def write_sitemap(manifest, root, site_url):
+    """
+    Writes root/sitemap.xml listing every page in the manifest's index.
+    site_url is the absolute URL of the site root, e.g.
+    "https://example.com/static-website/". Returns True if it changed.
+    """
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for entry in _indexed_pages(manifest):
+        lines.append(f"  <url><loc>{escape(site_url + entry['url'][1:])}</loc>"
+                     f"<lastmod>{_timestamp(entry['mtime'])[:10]}</lastmod></url>")
+    lines.append("</urlset>")
+    return write_output(os.path.join(root, SITEMAP_NAME), ("\n".join(lines) + "\n").encode("utf-8"))
+
+
+def write_feed(manifest, root, site_url, name=FEED_NAME, section="/blog/", title=None):
+    """
+    Writes root/atom.xml, an Atom feed of the newest pages whose URL is
+    under section, from the titles, dates and URLs in the manifest's index.
+    The feed is titled after the home page unless a title is given. Returns
+    True if it changed.
+    """
+    pages = _indexed_pages(manifest)
+    posts = [entry for entry in pages if entry["url"].startswith(section) and entry["url"] != section]
+    posts.sort(key=lambda entry: (-entry["mtime"], entry["url"]))
+    posts = posts[:FEED_ENTRIES]
+    if title is None:
+        home = [entry for entry in pages if entry["url"] == "/"]
+        title = home[0]["title"] if home else site_url
+    feed_url = site_url + name
+    updated = max((entry["mtime"] for entry in posts), default=0)
+
+    lines = ['<?xml version="1.0" encoding="utf-8"?>',
+             '<feed xmlns="http://www.w3.org/2005/Atom">',
+             f"  <title>{escape(title)}</title>",
+             f"  <id>{escape(site_url)}</id>",
+             f'  <link href="{escape(site_url)}" />',
+             f'  <link rel="self" href="{escape(feed_url)}" />',
+             f"  <updated>{_timestamp(updated)}</updated>",
+             f"  <author><name>{escape(title)}</name></author>"]
+    for entry in posts:
+        url = escape(site_url + entry["url"][1:])
+        lines += ["  <entry>",
+                  f"    <title>{escape(entry['title'])}</title>",
+                  f'    <link href="{url}" />',
+                  f"    <id>{url}</id>",
+                  f"    <updated>{_timestamp(entry['mtime'])}</updated>",
+                  f"    <summary>{entry['words']} words</summary>",
+                  "  </entry>"]
+    lines.append("</feed>")
+    return write_output(os.path.join(root, name), ("\n".join(lines) + "\n").encode("utf-8"))
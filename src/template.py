@@ -0,0 +1,133 @@
+import re
+
+# the placeholders template.html may contain
+PLACEHOLDER_PATTERN = re.compile(r"\{\{ (Title|Content) \}\}")
+
+# root-relative href/src attributes in the template itself
+URL_ATTRIBUTE_PATTERN = re.compile(r'(href|src)="(/[^"]*)"')
+
+# elements whose contents are kept exactly as written when minifying
+VERBATIM_PATTERN = re.compile(r"<(pre|textarea|script|style)\b.*?</\1\s*>", re.S | re.I)
+# whitespace next to these tags never renders, so minifying drops it
+BLOCK_TAG_PATTERN = re.compile(
+    r"\s*(<(?:!doctype|/?(?:html|head|body|meta|link|title|base|article|section|header|footer|nav|main|"
+    r"aside|div|p|h[1-6]|ul|ol|li|blockquote|table|thead|tbody|tr|td|th|hr|br))\b[^>]*>)\s*", re.I)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def _minify_text(text):
+    return BLOCK_TAG_PATTERN.sub(r"\1", WHITESPACE_PATTERN.sub(" ", text))
+
+
+def minify_markup(text):
+    """
+    Minifies hand-written markup such as template.html: runs of whitespace
+    become one space and whitespace next to block-level tags is dropped.
+    pre, textarea, script and style elements are left untouched.
+    """
+    pieces = []
+    position = 0
+    for match in VERBATIM_PATTERN.finditer(text):
+        pieces.append(_minify_text(text[position:match.start()]))
+        pieces.append(match.group(0))
+        position = match.end()
+    pieces.append(_minify_text(text[position:]))
+    return "".join(pieces).strip()
+
+
+class BasePathRewriter:
+    """
+    Rewrites root-relative URLs ("/images/a.png") to live under the base
+    path ("/static-website/images/a.png"). A class rather than a closure so
+    it can be pickled into worker processes.
+
+    asset_urls optionally maps static file URLs to their fingerprinted
+    names ({"/index.css": "/index.3f2a9c1b04.css"}, see
+    assets.fingerprinted_urls); those are swapped in before the base path
+    is applied, keeping any query string or fragment.
+    """
+
+    def __init__(self, base_path, asset_urls=None):
+        self.base_path = base_path
+        self.asset_urls = asset_urls or {}
+
+    def __call__(self, url):
+        if not url.startswith("/"):
+            return url
+        if self.asset_urls:
+            path = url.split("?", 1)[0].split("#", 1)[0]
+            if path in self.asset_urls:
+                url = self.asset_urls[path] + url[len(path):]
+        return self.base_path + url[1:]
+
+
+def base_path_rewriter(base_path, asset_urls=None):
+    """
+    Returns the URL rewriter for base_path and fingerprinted asset URLs, or
+    None when the site is served from "/" without fingerprints and nothing
+    needs rewriting.
+    """
+    if base_path == "/" and not asset_urls:
+        return None
+    return BasePathRewriter(base_path, asset_urls)
+
+
+class Template:
+    """
+    A page template parsed once into literal segments and placeholder slots.
+
+    The base path (and asset fingerprints, if any) are applied to the
+    template's own href/src attributes when it is compiled, so rendering a
+    page is a single join of the segments with the slot values.
+
+    With minify, the template is minified when it is compiled and node
+    trees written into it are serialized minified as well.
+    """
+
+    def __init__(self, text, base_path="/", path=None, asset_urls=None, minify=False):
+        self.base_path = base_path
+        self.path = path
+        self.minify = minify
+        self.rewrite_url = base_path_rewriter(base_path, asset_urls)
+
+        if minify:
+            text = minify_markup(text)
+
+        # replace root-relative paths with the provided base_path
+        if self.rewrite_url is not None:
+            text = URL_ATTRIBUTE_PATTERN.sub(
+                lambda match: f'{match.group(1)}="{self.rewrite_url(match.group(2))}"', text)
+
+        # split() with a capture group alternates literal text and slot names
+        self.segments = PLACEHOLDER_PATTERN.split(text)
+
+    @classmethod
+    def from_file(cls, path, base_path="/", asset_urls=None, minify=False):
+        with open(path, 'r') as f:
+            return cls(f.read(), base_path, path, asset_urls, minify)
+
+    def render(self, **values):
+        """
+        Fills every slot with the matching keyword argument, e.g.
+        render(Title="Home", Content="<div>...</div>").
+        """
+        parts = list(self.segments)
+        for i in range(1, len(parts), 2):
+            parts[i] = values[parts[i]]
+        return "".join(parts)
+
+    def write(self, stream, **values):
+        """
+        Like render(), but writes straight into a text stream. A slot value
+        may be a string or an HTMLNode, which is serialized into the stream
+        with the template's URL rewriting rather than built as a string.
+        """
+        for i, segment in enumerate(self.segments):
+            if i % 2 == 0:
+                stream.write(segment)
+                continue
+            value = values[segment]
+            if isinstance(value, str):
+                stream.write(value)
+            else:
+                value.write_html(stream, self.rewrite_url, self.minify)
@@ -0,0 +1,32 @@
+import os
+import tempfile
+import unittest
+
+
+class TempDirTestCase(unittest.TestCase):
+    """
+    A test case that gets a fresh temporary directory, self.tmp, for each
+    test and removes it afterwards. Subclasses that build a tree in it call
+    super().setUp() first.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, path, text):
+        with open(path, 'w') as f:
+            f.write(text)
+
+
+def read_tree(root):
+    """
+    Returns {path relative to root: text} for every file under root.
+    """
+    tree = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            with open(path) as f:
+                tree[os.path.relpath(path, root)] = f.read()
+    return tree
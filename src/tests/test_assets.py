@@ -0,0 +1,86 @@
+import os
+import unittest
+
+from assets import sync_assets, fingerprinted_urls
+from manifest import BuildManifest
+from helpers import TempDirTestCase
+
+
+class TestSyncAssets(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png bytes")
+        self.manifest = BuildManifest(os.path.join(self.docs, ".manifest.json"))
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_first_sync_copies_everything(self):
+        stats = sync_assets(self.static, self.docs, self.manifest)
+        self.assertEqual(stats["copied"], 2)
+        self.assertEqual(self.read(os.path.join(self.docs, "images", "a.png")), "png bytes")
+
+    def test_unchanged_files_are_skipped(self):
+        sync_assets(self.static, self.docs, self.manifest)
+        # a touched but identical file is hashed once, then skipped on size/mtime
+        os.utime(os.path.join(self.static, "index.css"))
+        stats = sync_assets(self.static, self.docs, self.manifest)
+        self.assertEqual((stats["copied"], stats["unchanged"]), (0, 2))
+        css = (os.path.join(self.static, "index.css"), os.path.join(self.docs, "index.css"))
+        self.assertEqual(os.stat(css[0]).st_mtime_ns, os.stat(css[1]).st_mtime_ns)
+
+    def test_changed_file_is_copied(self):
+        sync_assets(self.static, self.docs, self.manifest)
+        self.write(os.path.join(self.static, "index.css"), "body { color: red }")
+        stats = sync_assets(self.static, self.docs, self.manifest)
+        self.assertEqual(stats["copied"], 1)
+        self.assertEqual(self.read(os.path.join(self.docs, "index.css")), "body { color: red }")
+
+    def test_hardlink_mode_links_files(self):
+        stats = sync_assets(self.static, self.docs, self.manifest, mode="hardlink")
+        self.assertEqual(stats["linked"], 2)
+        self.assertTrue(os.path.samefile(os.path.join(self.static, "index.css"),
+                                         os.path.join(self.docs, "index.css")))
+
+    def test_reflink_mode_copies_contents(self):
+        sync_assets(self.static, self.docs, self.manifest, mode="reflink")
+        self.assertEqual(self.read(os.path.join(self.docs, "index.css")), "body {}")
+        self.assertFalse(os.path.samefile(os.path.join(self.static, "index.css"),
+                                          os.path.join(self.docs, "index.css")))
+
+    def test_orphaned_assets_are_removed(self):
+        sync_assets(self.static, self.docs, self.manifest)
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        stats = sync_assets(self.static, self.docs, self.manifest)
+        self.assertEqual(stats["removed"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "images", "a.png")))
+
+    def test_fingerprinted_names_and_urls(self):
+        sync_assets(self.static, self.docs, self.manifest, fingerprint=True)
+        urls = fingerprinted_urls(self.manifest, self.static, self.docs)
+        self.assertEqual(sorted(urls), ["/images/a.png", "/index.css"])
+        self.assertRegex(urls["/index.css"], r"^/index\.[0-9a-f]{10}\.css$")
+        self.assertEqual(self.read(os.path.join(self.docs, urls["/index.css"][1:])), "body {}")
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.css")))
+
+    def test_changed_fingerprint_replaces_old_output(self):
+        sync_assets(self.static, self.docs, self.manifest, fingerprint=True)
+        old = fingerprinted_urls(self.manifest, self.static, self.docs)["/index.css"]
+        stats = sync_assets(self.static, self.docs, self.manifest, fingerprint=True)
+        self.assertEqual(stats["unchanged"], 2)
+
+        self.write(os.path.join(self.static, "index.css"), "body { color: red }")
+        sync_assets(self.static, self.docs, self.manifest, fingerprint=True)
+        new = fingerprinted_urls(self.manifest, self.static, self.docs)["/index.css"]
+        self.assertNotEqual(old, new)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, old[1:])))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, new[1:])))
+
+
+if __name__ == "__main__":
+    unittest.main()
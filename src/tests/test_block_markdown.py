@@ -1,5 +1,6 @@
-from block_markdown import markdown_to_blocks, block_to_block_type, BlockType
+from block_markdown import markdown_to_blocks, read_blocks, block_to_block_type, classify_block, BlockType
 
+import io
 import unittest
 
 class TestMarkdownToBlocks(unittest.TestCase):
@@ -45,6 +46,32 @@ class TestMarkdownToBlocks(unittest.TestCase):
             ],
             blocks,
         )
+    def test_fenced_code_keeps_blank_lines(self):
+        md = "Intro\n\n```\nline one\n\n    indented\n```\n\nAfter"
+        self.assertListEqual(
+            ["Intro", "```\nline one\n\n    indented\n```", "After"],
+            markdown_to_blocks(md),
+        )
+
+    def test_fence_opens_inside_a_block(self):
+        md = "Example:\n```\nx = 1\n\ny = 2\n```"
+        starts = []
+        self.assertListEqual(["Example:", "```\nx = 1\n\ny = 2\n```"], list(read_blocks(md.split("\n"), starts)))
+        self.assertListEqual(starts, [1, 2])
+
+    def test_read_blocks_is_lazy(self):
+        stream = io.StringIO("# Title\n\nfirst\nparagraph\n\nsecond\n")
+        blocks = read_blocks(stream)
+        self.assertEqual(next(blocks), "# Title")
+        self.assertEqual(stream.tell(), len("# Title\n\n"))
+        self.assertListEqual(["first\nparagraph", "second"], list(blocks))
+
+    def test_read_blocks_records_start_lines(self):
+        starts = []
+        md = "# Title\n\n\nfirst\nparagraph\n\n```\ncode\n\nmore\n```\nlast"
+        self.assertEqual(len(list(read_blocks(md.split("\n"), starts))), 4)
+        self.assertListEqual(starts, [1, 4, 7, 12])
+
     #--- block_to_block_type Tests ---
     def test_heading(self):
         self.assertEqual(block_to_block_type("# Heading 1"), BlockType.HEADING)
@@ -68,5 +95,10 @@ class TestMarkdownToBlocks(unittest.TestCase):
     def test_paragraph(self):
         self.assertEqual(block_to_block_type("This is a plain paragraph."), BlockType.PARAGRAPH)
 
+    def test_classify_block_returns_lines(self):
+        self.assertEqual(classify_block("- a\n  - b  "), (BlockType.UNORDERED_LIST, ["- a", "- b"]))
+        self.assertEqual(classify_block("```\n  x\n```"), (BlockType.CODE, ["```", "  x", "```"]))
+        self.assertEqual(classify_block("2. second\n3. third"), (BlockType.PARAGRAPH, ["2. second", "3. third"]))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -1,6 +1,7 @@
 import unittest
 
 from src.block_to_html_node import markdown_to_html_node
+from src import block_to_html_node
 
 
 
@@ -69,6 +70,67 @@ class TestMarkdownToHTML(unittest.TestCase):
             html,
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff</code></pre></div>",
         )
+    def test_codeblock_with_blank_line(self):
+        md = "```\nfirst\n\nsecond\n```"
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(html, "<div><pre><code>first\n\nsecond</code></pre></div>")
+
+    def test_fence_after_a_paragraph_line(self):
+        md = "Example:\n```\nx = 1\n\ny = 2\n```"
+        self.assertEqual(markdown_to_html_node(md).to_html(),
+                         "<div><p>Example:</p><pre><code>x = 1\n\ny = 2</code></pre></div>")
+
+    def test_links_are_collected_with_lines(self):
+        md = ("# Title\n\nSee [a](/a) and\n![img](/i.png)\n\n```\n[not](/code)\n```\n\n"
+              "- one\n- [two](two.html)\n\n> [q](/q)")
+        links = []
+        markdown_to_html_node(md, links)
+        self.assertListEqual(links, [[3, "a", "/a"], [4, "img", "/i.png"], [11, "a", "two.html"], [13, "a", "/q"]])
+
+    def test_link_lines_dont_depend_on_matching_urls(self):
+        md = ("Intro\nsee [post](/blog/post) first\nthen [blog](/blog)\n\n"
+              "# A [b](/b)\n\n> [c](/c) and\n> [c](/c)\n\n1. x\n2. ![i](/blog)")
+        expected = [[2, "a", "/blog/post"], [3, "a", "/blog"], [5, "a", "/b"], [7, "a", "/c"], [8, "a", "/c"],
+                    [11, "img", "/blog"]]
+        size = block_to_html_node.inline_cache_size()
+        try:
+            # memoized or not, the lines come out the same
+            for cache_size in (16, 0):
+                block_to_html_node.set_inline_cache_size(cache_size)
+                links = []
+                markdown_to_html_node(md, links)
+                self.assertListEqual(links, expected)
+        finally:
+            block_to_html_node.set_inline_cache_size(size)
+
+
+class TestInlineCache(unittest.TestCase):
+    def setUp(self):
+        self.size = block_to_html_node.inline_cache_size()
+        block_to_html_node.set_inline_cache_size(16)
+
+    def tearDown(self):
+        block_to_html_node.set_inline_cache_size(self.size)
+
+    def test_repeated_fragments_hit(self):
+        md = "- [Home](/)\n- [About](/about)\n\n- [Home](/)\n- [About](/about)"
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(html.count('<li><a href="/">Home</a></li>'), 2)
+        self.assertEqual(block_to_html_node.inline_cache_stats(), (2, 2))
+
+    def test_cached_nodes_are_fresh(self):
+        first = block_to_html_node.text_to_children("see [home](/) **now**")
+        first[1].props["href"] = "/changed"
+        first[3].value = "changed"
+        second = block_to_html_node.text_to_children("see [home](/) **now**")
+        self.assertEqual(block_to_html_node.inline_cache_stats(), (1, 1))
+        self.assertEqual("".join(node.to_html() for node in second), 'see <a href="/">home</a> <b>now</b>')
+
+    def test_disabled(self):
+        block_to_html_node.set_inline_cache_size(0)
+        markdown_to_html_node("same\n\nsame")
+        self.assertEqual(block_to_html_node.inline_cache_size(), 0)
+        self.assertEqual(block_to_html_node.inline_cache_stats(), (0, 0))
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,50 @@
+import gzip
+import os
+import unittest
+
+import compress
+from compress import compress_outputs
+from helpers import TempDirTestCase
+
+
+class TestCompressOutputs(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.docs = self.tmp.name
+        os.makedirs(os.path.join(self.docs, "blog"))
+        self.write(os.path.join(self.docs, "index.html"), "<p>home</p>" * 50)
+        self.write(os.path.join(self.docs, "blog", "post.html"), "<p>post</p>" * 50)
+        self.write(os.path.join(self.docs, "index.css"), "body {}")
+        self.write(os.path.join(self.docs, "a.png"), "png bytes")
+
+    def test_writes_gzip_sidecars(self):
+        stats = compress_outputs(self.docs)
+        self.assertEqual(stats["compressed"], 3 * len(compress._compressors()))
+        with gzip.open(os.path.join(self.docs, "index.html.gz"), 'rt') as f:
+            self.assertEqual(f.read(), "<p>home</p>" * 50)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "a.png.gz")))
+        self.assertEqual(os.path.exists(os.path.join(self.docs, "index.html.br")), compress.brotli is not None)
+
+    def test_up_to_date_sidecars_are_skipped(self):
+        compress_outputs(self.docs)
+        stats = compress_outputs(self.docs, jobs=2)
+        self.assertEqual((stats["compressed"], stats["unchanged"]), (0, 3))
+
+        path = os.path.join(self.docs, "index.html")
+        self.write(path, "<p>changed</p>")
+        os.utime(path, ns=(1, 1))
+        stats = compress_outputs(self.docs, jobs=2)
+        self.assertEqual((stats["compressed"], stats["unchanged"]), (len(compress._compressors()), 2))
+        with gzip.open(path + ".gz", 'rt') as f:
+            self.assertEqual(f.read(), "<p>changed</p>")
+
+    def test_sidecars_of_deleted_outputs_are_removed(self):
+        compress_outputs(self.docs)
+        os.remove(os.path.join(self.docs, "blog", "post.html"))
+        stats = compress_outputs(self.docs)
+        self.assertEqual(stats["removed"], len(compress._compressors()))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog")))
+
+
+if __name__ == "__main__":
+    unittest.main()
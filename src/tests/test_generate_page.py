@@ -0,0 +1,103 @@
+import os
+import unittest
+
+from generate_page import BuildOptions, generate_pages_recursive, generate_targets, PageBuildError
+from manifest import BuildManifest
+from profiler import BuildProfiler
+from helpers import TempDirTestCase, read_tree
+
+
+class TestGeneratePagesRecursive(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.template = os.path.join(root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+        for i in range(6):
+            self.write(os.path.join(self.content, "blog", f"post{i}.md"), f"# Post {i}\n\nSee [home](/).")
+
+    def test_parallel_output_matches_serial(self):
+        serial = os.path.join(self.tmp.name, "serial")
+        parallel = os.path.join(self.tmp.name, "parallel")
+        generate_pages_recursive(self.content, self.template, serial, "/site/")
+        generate_pages_recursive(self.content, self.template, parallel, "/site/", options=BuildOptions(jobs=3))
+        self.assertEqual(read_tree(serial), read_tree(parallel))
+        self.assertEqual(len(read_tree(parallel)), 6)
+
+    def test_async_pipeline_output_matches_serial(self):
+        serial = os.path.join(self.tmp.name, "serial")
+        generate_pages_recursive(self.content, self.template, serial, "/site/")
+        for jobs in (1, 2):
+            piped = os.path.join(self.tmp.name, f"piped{jobs}")
+            generate_pages_recursive(self.content, self.template, piped, "/site/",
+                                     options=BuildOptions(jobs=jobs, io_limit=2))
+            self.assertEqual(read_tree(serial), read_tree(piped))
+
+    def test_async_pipeline_reports_errors_in_order(self):
+        self.write(os.path.join(self.content, "b.md"), "no title here")
+        self.write(os.path.join(self.content, "a.md"), "# Title\n\nan `unclosed code span")
+        with self.assertRaises(PageBuildError) as cm:
+            generate_pages_recursive(self.content, self.template, os.path.join(self.tmp.name, "docs"),
+                                     options=BuildOptions(io_limit=3))
+        self.assertEqual([source for source, _ in cm.exception.errors],
+                         [os.path.join(self.content, "a.md"), os.path.join(self.content, "b.md")])
+
+    def test_all_errors_are_reported_in_order(self):
+        self.write(os.path.join(self.content, "b.md"), "no title here")
+        self.write(os.path.join(self.content, "a.md"), "# Title\n\nan `unclosed code span")
+        dest = os.path.join(self.tmp.name, "docs")
+        with self.assertRaises(PageBuildError) as cm:
+            generate_pages_recursive(self.content, self.template, dest, options=BuildOptions(jobs=2))
+        self.assertEqual([source for source, _ in cm.exception.errors],
+                         [os.path.join(self.content, "a.md"), os.path.join(self.content, "b.md")])
+        # the good pages were still built
+        self.assertEqual(len(os.listdir(os.path.join(dest, "blog"))), 6)
+
+    def test_profiler_collects_stages_from_workers(self):
+        profiler = BuildProfiler()
+        generate_pages_recursive(self.content, self.template, os.path.join(self.tmp.name, "docs"),
+                                 options=BuildOptions(jobs=2, profiler=profiler))
+        parsed = sorted(page for page, name, _, _ in profiler.records if name == "parse")
+        self.assertEqual(parsed, sorted(os.path.join(self.content, "blog", f"post{i}.md") for i in range(6)))
+
+    def test_title_is_escaped_like_the_heading(self):
+        self.write(os.path.join(self.content, "blog", "post0.md"), "# Tom &amp; Jerry &copy; 2024 & co\n\n![Tom &amp; Jerry](/t.png)")
+        dest = os.path.join(self.tmp.name, "docs")
+        generate_pages_recursive(self.content, self.template, dest)
+        html = read_tree(dest)[os.path.join("blog", "post0.html")]
+        self.assertIn("<title>Tom &amp; Jerry &copy; 2024 &amp; co</title>", html)
+        self.assertIn("<h1>Tom &amp; Jerry &copy; 2024 &amp; co</h1>", html)
+        self.assertIn('alt="Tom &amp; Jerry"', html)
+
+    def test_targets_match_separate_builds_and_parse_once(self):
+        root = self.tmp.name
+        generate_pages_recursive(self.content, self.template, os.path.join(root, "single-root"), "/")
+        generate_pages_recursive(self.content, self.template, os.path.join(root, "single-site"), "/site/")
+        for io_limit in (0, 2):
+            profiler = BuildProfiler()
+            targets = [("/", os.path.join(root, f"root{io_limit}"), None),
+                       ("/site/", os.path.join(root, f"site{io_limit}"), None)]
+            generate_targets(self.content, self.template, targets, BuildOptions(profiler=profiler, io_limit=io_limit))
+            self.assertEqual(read_tree(os.path.join(root, "single-root")), read_tree(targets[0][1]))
+            self.assertEqual(read_tree(os.path.join(root, "single-site")), read_tree(targets[1][1]))
+            self.assertEqual(sum(name == "parse" for _, name, _, _ in profiler.records), 6)
+
+    def test_targets_rebuild_only_stale_outputs(self):
+        root = self.tmp.name
+        manifests = [BuildManifest(os.path.join(root, "a", ".manifest.json")),
+                     BuildManifest(os.path.join(root, "b", ".manifest.json"))]
+        targets = [("/", os.path.join(root, "a"), manifests[0]), ("/b/", os.path.join(root, "b"), manifests[1])]
+        generate_targets(self.content, self.template, targets)
+        # a new target directory is built in full, the existing one is skipped
+        targets[1] = ("/b/", os.path.join(root, "c"), BuildManifest(os.path.join(root, "c", ".manifest.json")))
+        profiler = BuildProfiler()
+        generate_targets(self.content, self.template, targets, BuildOptions(profiler=profiler))
+        writes = [name for _, name, _, _ in profiler.records if name == "write"]
+        self.assertEqual(len(writes), 6)
+        self.assertEqual(len(os.listdir(os.path.join(root, "c", "blog"))), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
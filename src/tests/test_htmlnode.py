@@ -1,4 +1,7 @@
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, escape_text, escape_attribute
+import copy
+import io
+import pickle
 import unittest
 
 class TestHTMLNode(unittest.TestCase):
@@ -120,6 +123,84 @@ class TestHTMLNode(unittest.TestCase):
         with self.assertRaises(ValueError):
             ParentNode("div", [])
 
+    # --- write_html Tests ---
+
+    def test_write_html_matches_to_html(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode("b", "Bold"), LeafNode("", " text")]),
+            LeafNode("a", "link", {"href": "/x"}),
+        ])
+        stream = io.StringIO()
+        node.write_html(stream)
+        self.assertEqual(stream.getvalue(), node.to_html())
+
+    def test_write_html_into_list(self):
+        pieces = []
+        ParentNode("p", [LeafNode("", "hi")]).write_html(pieces)
+        self.assertEqual("".join(pieces), "<p>hi</p>")
+
+    def test_very_deep_tree_does_not_hit_recursion_limit(self):
+        node = LeafNode("", "x")
+        for _ in range(10000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span>" * 10000 + "x</span>"))
+        self.assertEqual(len(html), 10000 * len("<span></span>") + 1)
+
+    def test_text_and_attributes_are_escaped(self):
+        node = ParentNode("p", [
+            LeafNode("", "a < b & c > d, &copy; \"quoted\""),
+            LeafNode("code", "if a < b && c: &amp;"),
+            LeafNode("a", "link", {"href": "/search?q=a&b=\"c\""}),
+        ])
+        self.assertEqual(
+            node.to_html(),
+            '<p>a &lt; b &amp; c &gt; d, &copy; "quoted"'
+            '<code>if a &lt; b &amp;&amp; c: &amp;amp;</code>'
+            '<a href="/search?q=a&amp;b=&quot;c&quot;">link</a></p>',
+        )
+
+    def test_plain_text_is_not_copied(self):
+        text = "nothing to escape here"
+        self.assertIs(escape_text(text), text)
+        self.assertIs(escape_attribute(text), text)
+
+    def test_minify_collapses_text_but_not_pre_or_code(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode("", "a  quote\n  here "), LeafNode("code", "x  =  1")]),
+            ParentNode("pre", [LeafNode("code", "def f():\n    return  1")]),
+        ])
+        self.assertEqual(
+            node.to_html(minify=True),
+            "<div><p>a quote here <code>x  =  1</code></p><pre><code>def f():\n    return  1</code></pre></div>",
+        )
+        self.assertEqual(node.to_html(), node.to_html(minify=False))
+        self.assertIn("a  quote", node.to_html())
+
+    def test_alt_keeps_references_but_urls_are_escaped_in_full(self):
+        node = LeafNode("img", "", {"src": "/t.png?a=1&amp;b=2", "alt": "Tom &amp; Jerry & co"})
+        self.assertEqual(node.to_html(), '<img src="/t.png?a=1&amp;amp;b=2" alt="Tom &amp; Jerry &amp; co"></img>')
+        self.assertEqual(escape_attribute('&copy; "x"', keep_references=True), '&copy; &quot;x&quot;')
+
+    def test_trees_pickle_and_deepcopy(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode("b", "bold"), LeafNode("", " & text")]),
+            LeafNode("a", "link", {"href": "/x"}),
+            LeafNode("img", "", {"src": "/i.png", "alt": ""}),
+        ])
+        for clone in (pickle.loads(pickle.dumps(node)), copy.deepcopy(node)):
+            self.assertEqual(clone, node)
+            self.assertEqual(clone.to_html(), node.to_html())
+            # the copy's props are its own, even where the original shared the empty default
+            clone.children[0].props["class"] = "x"
+            self.assertEqual(node.children[0].props_to_html(), "")
+
+    def test_empty_props_passed_in_stay_mutable(self):
+        props = {}
+        node = LeafNode("a", "link", props)
+        node.props["href"] = "/x"
+        self.assertEqual(node.to_html(), '<a href="/x">link</a>')
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
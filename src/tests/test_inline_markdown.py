@@ -197,6 +197,34 @@ class TestInlineMarkdown(unittest.TestCase):
             nodes
         )
 
+    def test_delimiters_inside_code_are_literal(self):
+        nodes = text_to_textnodes("call `snake_case_name` with *care*")
+        self.assertListEqual(
+            [
+                TextNode("call ", TextType.TEXT),
+                TextNode("snake_case_name", TextType.CODE),
+                TextNode(" with ", TextType.TEXT),
+                TextNode("care", TextType.ITALIC),
+            ],
+            nodes
+        )
+
+    def test_image_takes_priority_over_link(self):
+        nodes = text_to_textnodes("[x![alt](/a.png) and [link](/b)")
+        self.assertListEqual(
+            [
+                TextNode("[x", TextType.TEXT),
+                TextNode("alt", TextType.IMAGE, "/a.png"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("link", TextType.LINK, "/b"),
+            ],
+            nodes
+        )
+
+    def test_unclosed_delimiter_still_raises(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("a **bold start and [link](/x)**")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,70 @@
+import os
+import unittest
+
+from generate_page import BuildOptions, generate_pages_recursive
+from link_check import check_links, resolve_link
+from manifest import BuildManifest, MANIFEST_NAME
+from page_cache import PageCache
+from search_index import write_search_index
+from site_index import write_feed, write_sitemap
+from helpers import TempDirTestCase
+
+
+class TestLinkCheck(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.template = os.path.join(root, "template.html")
+        self.docs = os.path.join(root, "docs")
+        os.makedirs(os.path.join(self.content, "blog", "tom"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"),
+                   "# Home\n\n[Tom](/blog/tom) [Tom again](/blog/tom/) [ext](https://example.com/x)\n"
+                   "[top](#top) [mail](mailto:a@b.c)\n\n![pic](/images/tom.png)")
+        self.write(os.path.join(self.content, "blog", "tom", "index.md"),
+                   "# Tom\n\n- [home](../../index.html)\n- [gone](/blog/ann/)\n\n![pic](/images/ann.png)")
+
+    def build(self, cache=None, index_terms=False):
+        manifest = BuildManifest(os.path.join(self.docs, MANIFEST_NAME))
+        manifest.record_asset(os.path.join(self.static, "images", "tom.png"),
+                              os.path.join(self.docs, "images", "tom.3f2a9c1b04.png"))
+        generate_pages_recursive(self.content, self.template, self.docs, "/site/", manifest,
+                                 BuildOptions(cache=cache, index_terms=index_terms))
+        return manifest
+
+    def test_resolve_link(self):
+        self.assertEqual(resolve_link("/blog/tom", "/"), "/blog/tom")
+        self.assertEqual(resolve_link("../a%20b.html#x", "/blog/tom/"), "/blog/a b.html")
+        self.assertEqual(resolve_link("./", "/blog/tom/"), "/blog/tom/")
+        for url in ("https://example.com/", "//cdn.example.com/x.js", "mailto:a@b.c", "#top"):
+            self.assertIsNone(resolve_link(url, "/"))
+
+    def test_broken_links_are_reported_with_source_and_line(self):
+        tom = os.path.join(self.content, "blog", "tom", "index.md")
+        self.assertEqual(check_links(self.build(), self.docs, self.static),
+                         [(tom, 4, "a", "/blog/ann/"), (tom, 6, "img", "/images/ann.png")])
+
+    def test_cached_parse_keeps_links(self):
+        cache = PageCache(os.path.join(self.tmp.name, "cache"), 2**20)
+        first = check_links(self.build(cache), self.docs, self.static)
+        self.assertEqual(check_links(self.build(cache), self.docs, self.static), first)
+        self.assertEqual(len(first), 2)
+
+    def test_generated_files_can_be_linked_to(self):
+        self.write(os.path.join(self.content, "blog", "feeds.md"),
+                   "# Feeds\n\n[map](/sitemap.xml) [feed](../atom.xml) [index](/search/index.json)")
+        feeds = os.path.join(self.content, "blog", "feeds.md")
+        manifest = self.build(index_terms=True)
+        broken = [link for link in check_links(manifest, self.docs, self.static) if link[0] == feeds]
+        self.assertEqual(len(broken), 3)
+
+        write_sitemap(manifest, self.docs, "https://example.com/site/")
+        write_feed(manifest, self.docs, "https://example.com/site/")
+        write_search_index(manifest, self.docs, "/site/")
+        self.assertEqual([link for link in check_links(manifest, self.docs, self.static) if link[0] == feeds], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
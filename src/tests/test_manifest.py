@@ -0,0 +1,116 @@
+import os
+import unittest
+from unittest import mock
+
+import page_cache
+from generate_page import generate_pages_recursive
+from manifest import BuildManifest, MANIFEST_NAME, stream_output, write_output
+from helpers import TempDirTestCase
+
+
+class TestIncrementalBuild(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.dest = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post")
+        self.manifest_path = os.path.join(self.dest, MANIFEST_NAME)
+
+    def build(self, base_path="/"):
+        manifest = BuildManifest.load(self.manifest_path)
+        generate_pages_recursive(self.content, self.template, self.dest, base_path, manifest)
+        manifest.save()
+        return manifest
+
+    def test_unchanged_pages_are_skipped(self):
+        self.build()
+        os.utime(os.path.join(self.dest, "index.html"), ns=(0, 0))
+        self.build()
+        self.assertEqual(os.stat(os.path.join(self.dest, "index.html")).st_mtime_ns, 0)
+
+    def test_changed_markdown_is_rebuilt(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# New Home")
+        self.build()
+        with open(os.path.join(self.dest, "index.html")) as f:
+            self.assertIn("New Home", f.read())
+
+    def test_template_or_base_path_change_rebuilds_everything(self):
+        index = os.path.join(self.dest, "index.html")
+        # a link, so the base path changes the page's bytes
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/post)")
+        self.build()
+        os.utime(index, ns=(0, 0))
+        self.build("/site/")
+        self.assertNotEqual(os.stat(index).st_mtime_ns, 0)
+
+        os.utime(index, ns=(0, 0))
+        self.write(self.template, "{{ Title }}|{{ Content }}")
+        self.build("/site/")
+        self.assertNotEqual(os.stat(index).st_mtime_ns, 0)
+
+    def test_parser_version_change_rebuilds_everything(self):
+        source = os.path.join(self.content, "index.md")
+        before = self.build().pages[source]["template_hash"]
+        with mock.patch.object(page_cache, "PARSER_VERSION", "next"):
+            manifest = self.build()
+        # a skipped page would have kept its old entry
+        self.assertNotEqual(manifest.pages[source]["template_hash"], before)
+
+    def test_identical_output_is_not_rewritten(self):
+        index = os.path.join(self.dest, "index.html")
+        self.build()
+        os.utime(index, ns=(0, 0))
+        # a new base path with no links to rewrite renders the same bytes
+        self.build("/site/")
+        self.assertEqual(os.stat(index).st_mtime_ns, 0)
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        manifest = self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+        self.assertEqual(list(manifest.pages), [os.path.join(self.content, "index.md")])
+
+    def test_write_output_is_atomic_and_skips_identical_bytes(self):
+        path = os.path.join(self.dest, "a", "page.html")
+        self.assertTrue(write_output(path, b"one"))
+        self.assertFalse(write_output(path, b"one"))
+        self.assertTrue(write_output(path, b"two"))
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b"two")
+        # no temp files are left behind
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["page.html"])
+
+    def test_stream_output_hashes_as_it_writes(self):
+        path = os.path.join(self.dest, "page.html")
+        text = "caf\u00e9 " * 50000
+        self.assertTrue(stream_output(path, lambda stream: stream.write(text)))
+        os.utime(path, ns=(0, 0))
+        self.assertFalse(stream_output(path, lambda stream: stream.write(text)))
+        self.assertEqual(os.stat(path).st_mtime_ns, 0)
+        self.assertFalse(write_output(path, text.encode("utf-8")))
+
+        def fail(stream):
+            stream.write("partial")
+            raise OSError("disk full")
+        with self.assertRaises(OSError):
+            stream_output(path, fail)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), text.encode("utf-8"))
+        # no temp files are left behind
+        self.assertEqual(os.listdir(self.dest), ["page.html"])
+
+    def test_corrupt_manifest_loads_empty(self):
+        os.makedirs(self.dest)
+        self.write(self.manifest_path, "not json")
+        self.assertEqual(BuildManifest.load(self.manifest_path).pages, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import stat
+import unittest
+from unittest import mock
+
+import generate_page
+import page_cache
+from htmlnode import LeafNode, ParentNode
+from page_cache import CachedPage, PageCache
+from template import base_path_rewriter
+from helpers import TempDirTestCase
+
+
+class TestPageCache(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = PageCache(os.path.join(self.tmp.name, "cache"))
+        self.node = ParentNode("div", [
+            LeafNode("a", "home", {"href": "/"}),
+            LeafNode("img", "", {"src": "/images/a.png", "alt": "a"}),
+            LeafNode("", " and text"),
+        ])
+
+    def test_round_trip_for_any_base_path(self):
+        self.cache.put("abc", "Title", self.node)
+        page = self.cache.get("abc")
+        self.assertEqual(page.title, "Title")
+        rewrite = base_path_rewriter("/site/")
+        self.assertEqual(page.to_html(rewrite), self.node.to_html(rewrite))
+        self.assertEqual(page.to_html(), self.node.to_html())
+
+    def test_minified_pages_are_cached_separately(self):
+        node = ParentNode("p", [LeafNode("", "two  spaces")])
+        self.cache.put("abc", "Title", node)
+        self.assertIsNone(self.cache.get("abc", minify=True))
+        self.cache.put("abc", "Title", node, minify=True)
+        self.assertEqual(self.cache.get("abc", minify=True).to_html(), "<p>two spaces</p>")
+        self.assertEqual(self.cache.get("abc").to_html(), "<p>two  spaces</p>")
+
+    def test_urls_are_rewritten_before_escaping(self):
+        node = ParentNode("p", [LeafNode("a", "q", {"href": "/find?a=1&b=2"})])
+        self.cache.put("abc", "Title", node)
+        rewrite = base_path_rewriter("/site/")
+        self.assertEqual(self.cache.get("abc").to_html(rewrite), '<p><a href="/site/find?a=1&amp;b=2">q</a></p>')
+
+    def test_miss_and_parser_version(self):
+        self.assertIsNone(self.cache.get("abc"))
+        self.cache.put("abc", "Title", self.node)
+        with mock.patch.object(page_cache, "PARSER_VERSION", "next"):
+            self.assertIsNone(self.cache.get("abc"))
+
+    def test_text_containing_the_url_mark_is_not_cached(self):
+        node = ParentNode("p", [LeafNode("", "odd \0 text")])
+        self.assertIsNone(CachedPage.from_node("Title", node))
+        self.assertIsNone(self.cache.put("abc", "Title", node))
+
+    def test_evicts_least_recently_used(self):
+        for i, key in enumerate(("old", "used", "new")):
+            self.cache.put(key, "Title", self.node)
+            os.utime(self.cache._path(key), ns=(i * 10**9, i * 10**9))
+        self.cache.get("used")  # now the most recently used
+        self.cache.max_bytes = 2 * os.path.getsize(self.cache._path("new"))
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertIsNone(self.cache.get("old"))
+        self.assertIsNotNone(self.cache.get("used"))
+        self.assertIsNotNone(self.cache.get("new"))
+
+    def test_entries_are_written_like_outputs(self):
+        self.cache.put("abc", "Title", self.node)
+        path = self.cache._path("abc")
+        umask = os.umask(0)
+        os.umask(umask)
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o666 & ~umask)
+        # a temp file left by an interrupted write is neither counted nor removed
+        leftover = os.path.join(os.path.dirname(path), ".stale.tmp")
+        self.write(leftover, "x" * 10000)
+        self.cache.max_bytes = os.path.getsize(path)
+        self.assertEqual(self.cache.evict(), 0)
+        self.assertTrue(os.path.exists(leftover))
+
+    def test_template_change_skips_parsing(self):
+        content = os.path.join(self.tmp.name, "content")
+        template = os.path.join(self.tmp.name, "template.html")
+        dest = os.path.join(self.tmp.name, "docs")
+        os.makedirs(content)
+        with open(os.path.join(content, "index.md"), 'w') as f:
+            f.write("# Home\n\n[link](/about)")
+        with open(template, 'w') as f:
+            f.write("{{ Title }}|{{ Content }}")
+        options = generate_page.BuildOptions(cache=self.cache)
+        generate_page.generate_pages_recursive(content, template, dest, options=options)
+
+        with open(template, 'w') as f:
+            f.write("<h1>{{ Title }}</h1>{{ Content }}")
+        with mock.patch.object(generate_page, "parse_page") as parse:
+            generate_page.generate_pages_recursive(content, template, dest, "/site/", options=options)
+        parse.assert_not_called()
+        with open(os.path.join(dest, "index.html")) as f:
+            self.assertEqual(f.read(), '<h1>Home</h1><div><h1>Home</h1><p><a href="/site/about">link</a></p></div>')
+
+
+if __name__ == "__main__":
+    unittest.main()
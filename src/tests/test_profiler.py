@@ -0,0 +1,44 @@
+import unittest
+
+from profiler import BuildProfiler, profile_stage
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def test_stage_records_time_and_allocations(self):
+        profiler = BuildProfiler()
+        with profiler.stage("parse", "a.md"):
+            kept = [object() for _ in range(1000)]
+        page, name, seconds, blocks = profiler.records[0]
+        self.assertEqual((page, name), ("a.md", "parse"))
+        self.assertGreaterEqual(seconds, 0)
+        self.assertGreaterEqual(blocks, 1000)
+        self.assertEqual(len(kept), 1000)
+
+    def test_stage_recorded_even_when_it_raises(self):
+        profiler = BuildProfiler()
+        with self.assertRaises(ValueError):
+            with profiler.stage("parse", "bad.md"):
+                raise ValueError("broken page")
+        self.assertEqual(len(profiler.records), 1)
+
+    def test_report_lists_slowest_pages_first(self):
+        profiler = BuildProfiler()
+        profiler.merge([
+            ("fast.md", "parse", 0.001, 10),
+            ("slow.md", "parse", 0.5, 10),
+            ("slow.md", "write", 0.2, 5),
+            (None, "copy static", 0.01, 1),
+        ])
+        report = profiler.report(top=1)
+        self.assertIn("Slowest 1 of 2 pages", report)
+        self.assertIn("slow.md", report)
+        self.assertNotIn("fast.md", report)
+        self.assertIn("copy static", report)
+
+    def test_profile_stage_without_profiler_is_a_no_op(self):
+        with profile_stage(None, "parse", "a.md"):
+            pass
+
+
+if __name__ == "__main__":
+    unittest.main()
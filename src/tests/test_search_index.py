@@ -0,0 +1,137 @@
+import gzip
+import json
+import os
+import unittest
+from unittest import mock
+
+import generate_page
+from block_to_html_node import markdown_to_html_node
+from generate_page import BuildOptions, generate_pages_recursive
+from manifest import BuildManifest, MANIFEST_NAME
+from page_cache import PageCache
+from search_index import SEARCH_DIR, count_terms, write_search_index
+from helpers import TempDirTestCase
+
+
+def page_terms(html_node):
+    # the terms of a rendered page's text, leaving out code: what the
+    # counts made while parsing should come to
+    terms = {}
+    stack = [html_node]
+    while stack:
+        node = stack.pop()
+        if node.children:
+            stack.extend(node.children)
+        elif node.tag != "code" and node.value:
+            count_terms(node.value, terms)
+    return terms
+
+
+class TestSearchIndex(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.template = os.path.join(root, "template.html")
+        self.docs = os.path.join(root, "docs")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nThe ring, the **ring** and a road.")
+        self.write(os.path.join(self.content, "blog", "tom.md"), "# Tom\n\nA road to Valinor.")
+
+    def build(self, cache=None, index_terms=True):
+        manifest = BuildManifest.load(os.path.join(self.docs, MANIFEST_NAME))
+        generate_pages_recursive(self.content, self.template, self.docs, "/site/", manifest,
+                                 BuildOptions(cache=cache, index_terms=index_terms))
+        stats = write_search_index(manifest, self.docs, "/site/")
+        manifest.save()
+        return stats
+
+    def read_index(self):
+        directory = os.path.join(self.docs, SEARCH_DIR)
+        with open(os.path.join(directory, "index.json")) as f:
+            index = json.load(f)
+        shards = {}
+        for name in index["shards"].values():
+            with gzip.open(os.path.join(directory, name), 'rt') as f:
+                shards.update(json.load(f))
+        return index, shards
+
+    def test_page_terms_skip_code(self):
+        terms = page_terms(markdown_to_html_node("The Ring, the ring.\n\n```\nring()\n```\n\nA `ring` é"))
+        self.assertEqual(terms, {"the": 2, "ring": 2})
+
+    def test_terms_are_counted_while_parsing(self):
+        markdown = "# The Ring\n\nThe **ring**, a [road](/r) and `ring`.\n\n> one ring\n\n* two\n* rings\n\n```\nring\n```"
+        terms = {}
+        node = markdown_to_html_node(markdown, terms=terms)
+        self.assertEqual(terms, page_terms(node))
+        self.assertEqual(terms["ring"], 3)
+
+    def test_index_maps_terms_to_pages(self):
+        self.build()
+        index, shards = self.read_index()
+        self.assertEqual(index["pages"], [["/site/", "Home"], ["/site/blog/tom.html", "Tom"]])
+        self.assertEqual(shards["ring"], [0, 2])
+        self.assertEqual(shards["road"], [0, 1, 1, 1])
+        self.assertEqual(index["shards"]["ri"], "ri.json.gz")
+
+    def test_incremental_build_rewrites_only_changed_shards(self):
+        cache = PageCache(os.path.join(self.tmp.name, "cache"), 2**20)
+        self.build(cache)
+        self.assertEqual(self.build(cache)["written"], 0)
+
+        self.write(os.path.join(self.content, "blog", "tom.md"), "# Tom\n\nA road to Bree.")
+        stats = self.build(cache)
+        # "br" is new, "va" is gone; "ro" and "to" keep their postings
+        self.assertEqual((stats["written"], stats["removed"]), (1, 1))
+        _, shards = self.read_index()
+        self.assertEqual(shards["bree"], [1, 1])
+        self.assertNotIn("valinor", shards)
+
+    def test_pages_built_without_terms_are_indexed_once_asked_for(self):
+        cache = PageCache(os.path.join(self.tmp.name, "cache"), 2**20)
+        self.build(cache, index_terms=False)
+        self.assertEqual(self.read_index()[0]["pages"], [])
+        self.build(cache)
+        index, shards = self.read_index()
+        self.assertEqual(len(index["pages"]), 2)
+        self.assertEqual(shards["valinor"], [1, 1])
+
+    def test_toggling_the_index_doesnt_rebuild_pages(self):
+        self.build()
+        with mock.patch.object(generate_page, "parse_page", wraps=generate_page.parse_page) as parse:
+            self.build(index_terms=False)
+            before = self.build()
+            self.assertEqual(parse.call_count, 0)
+        self.assertEqual(before["written"], 0)
+
+        # a page rebuilt without the index loses its terms and is the only one parsed again
+        self.write(os.path.join(self.content, "blog", "tom.md"), "# Tom\n\nA road to Bree.")
+        self.build(index_terms=False)
+        with mock.patch.object(generate_page, "parse_page", wraps=generate_page.parse_page) as parse:
+            self.build()
+            self.assertEqual(parse.call_count, 1)
+        self.assertEqual(self.read_index()[1]["bree"], [1, 1])
+
+    def test_page_ids_are_stable(self):
+        self.build()
+        ann = os.path.join(self.content, "blog", "ann.md")
+        self.write(ann, "# Ann\n\nQuiet Shire.")
+        stats = self.build()
+        # only the new page's shards ("an", "qu", "sh") are written
+        self.assertEqual(stats["written"], 3)
+        index, shards = self.read_index()
+        self.assertEqual(index["pages"], [["/site/", "Home"], ["/site/blog/tom.html", "Tom"],
+                                          ["/site/blog/ann.html", "Ann"]])
+        self.assertEqual(shards["road"], [0, 1, 1, 1])
+
+        os.remove(ann)
+        self.build()
+        index, shards = self.read_index()
+        self.assertIsNone(index["pages"][2])
+        self.assertNotIn("shire", shards)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import random
+import unittest
+
+from generate_page import BuildOptions, collect_pages, generate_targets
+from manifest import BuildManifest, MANIFEST_NAME
+from shard import ShardMergeError, find_shards, merge_shards, parse_shard, partition_pages, shard_dir
+from helpers import TempDirTestCase, read_tree
+
+
+class TestShards(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.template = os.path.join(root, "template.html")
+        self.docs = os.path.join(root, "docs")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        for i in range(10):
+            self.write(os.path.join(self.content, "blog", f"post{i}.md"), f"# Post {i}\n\n" + "words " * (i * 40))
+
+    def build_shards(self, count):
+        for index in range(1, count + 1):
+            path = shard_dir(self.docs, index, count)
+            manifest = BuildManifest(os.path.join(path, MANIFEST_NAME))
+            generate_targets(self.content, self.template, [("/", path, manifest)], BuildOptions(shard=(index, count)))
+            manifest.save()
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for value in ("0/4", "5/4", "2", "a/b"):
+            with self.assertRaises(ValueError):
+                parse_shard(value)
+
+    def test_partition_is_deterministic_and_balanced(self):
+        pages = collect_pages(self.content, self.docs)
+        shuffled = pages[:]
+        random.Random(1).shuffle(shuffled)
+        shards = partition_pages(pages, self.content, 3)
+        self.assertEqual(partition_pages(shuffled, self.content, 3), shards)
+        self.assertEqual(sorted(page for shard in shards for page in shard), pages)
+
+        sizes = [sum(os.path.getsize(source) for source, _ in shard) for shard in shards]
+        self.assertLess(max(sizes) - min(sizes), max(os.path.getsize(source) for source, _ in pages))
+
+    def test_merged_shards_match_a_single_build(self):
+        generate_targets(self.content, self.template, [("/", os.path.join(self.tmp.name, "single"), None)])
+        self.build_shards(3)
+        manifest = BuildManifest(os.path.join(self.docs, MANIFEST_NAME))
+        merge_shards(find_shards(self.docs), self.docs, manifest)
+        self.assertEqual(read_tree(self.docs), read_tree(os.path.join(self.tmp.name, "single")))
+        self.assertEqual(len(manifest.pages), 10)
+        self.assertTrue(all(entry["output"].startswith(self.docs + os.sep) for entry in manifest.pages.values()))
+
+    def test_conflicting_and_missing_shards_are_reported(self):
+        self.build_shards(2)
+        self.write(os.path.join(shard_dir(self.docs, 1, 2), "extra.txt"), "one")
+        self.write(os.path.join(shard_dir(self.docs, 2, 2), "extra.txt"), "two")
+        os.makedirs(self.docs)
+        self.write(os.path.join(self.docs, "keep.html"), "old build")
+        with self.assertRaises(ShardMergeError) as cm:
+            merge_shards(find_shards(self.docs), self.docs, BuildManifest(None))
+        self.assertEqual(len(cm.exception.problems), 1)
+        self.assertIn("extra.txt", cm.exception.problems[0])
+        # nothing was touched
+        self.assertEqual(os.listdir(self.docs), ["keep.html"])
+
+        os.rename(shard_dir(self.docs, 2, 2), shard_dir(self.docs, 3, 3))
+        with self.assertRaises(ShardMergeError):
+            find_shards(self.docs)
+
+
+if __name__ == "__main__":
+    unittest.main()
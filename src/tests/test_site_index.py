@@ -0,0 +1,86 @@
+import os
+import unittest
+
+from block_to_html_node import markdown_to_html_node
+from generate_page import BuildOptions, generate_pages_recursive
+from manifest import BuildManifest, MANIFEST_NAME
+from page_cache import PageCache
+from site_index import page_url, word_count, write_feed, write_sitemap
+from helpers import TempDirTestCase
+
+
+class TestSiteIndex(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.template = os.path.join(root, "template.html")
+        self.docs = os.path.join(root, "docs")
+        os.makedirs(os.path.join(self.content, "blog", "tom"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home & Away\n\nWelcome home.")
+        self.write(os.path.join(self.content, "blog", "tom", "index.md"), "# Tom\n\nOne two three.")
+        self.write(os.path.join(self.content, "blog", "ann.md"), "# Ann\n\nFour five.\n\n```\nnot counted\n```")
+        os.utime(os.path.join(self.content, "blog", "ann.md"), (1700000000, 1700000000))
+        os.utime(os.path.join(self.content, "blog", "tom", "index.md"), (1600000000, 1600000000))
+
+    def build(self, cache=None):
+        manifest = BuildManifest.load(os.path.join(self.docs, MANIFEST_NAME))
+        generate_pages_recursive(self.content, self.template, self.docs, "/", manifest, BuildOptions(cache=cache))
+        manifest.save()
+        return BuildManifest.load(os.path.join(self.docs, MANIFEST_NAME))
+
+    def read(self, name):
+        with open(os.path.join(self.docs, name)) as f:
+            return f.read()
+
+    def test_page_url(self):
+        self.assertEqual(page_url(os.path.join(self.docs, "index.html"), self.docs), "/")
+        self.assertEqual(page_url(os.path.join(self.docs, "blog", "tom", "index.html"), self.docs), "/blog/tom/")
+        self.assertEqual(page_url(os.path.join(self.docs, "blog", "ann.html"), self.docs), "/blog/ann.html")
+
+    def test_word_count_skips_code(self):
+        self.assertEqual(word_count(markdown_to_html_node("Four **five** six.\n\n```\nnot counted\n```")), 3)
+
+    def test_manifest_records_page_metadata(self):
+        manifest = self.build()
+        entry = manifest.pages[os.path.join(self.content, "blog", "ann.md")]
+        self.assertEqual((entry["url"], entry["title"], entry["words"], entry["mtime"]),
+                         ("/blog/ann.html", "Ann", 3, 1700000000))
+        self.assertIn("content_hash", entry)
+
+    def test_cached_parse_keeps_metadata(self):
+        cache = PageCache(os.path.join(self.tmp.name, "cache"), 2**20)
+        first = self.build(cache)
+        os.remove(os.path.join(self.docs, MANIFEST_NAME))
+        self.assertEqual(self.build(cache).pages, first.pages)
+
+    def test_sitemap_and_feed(self):
+        manifest = self.build()
+        write_sitemap(manifest, self.docs, "https://example.com/site/")
+        write_feed(manifest, self.docs, "https://example.com/site/")
+
+        sitemap = self.read("sitemap.xml")
+        self.assertIn("<loc>https://example.com/site/</loc>", sitemap)
+        self.assertIn("<loc>https://example.com/site/blog/tom/</loc><lastmod>2020-09-13</lastmod>", sitemap)
+
+        feed = self.read("atom.xml")
+        self.assertIn("<title>Home &amp; Away</title>", feed)
+        self.assertIn('<link rel="self" href="https://example.com/site/atom.xml" />', feed)
+        self.assertIn("<updated>2023-11-14T22:13:20Z</updated>", feed)
+        # newest first, and the home page isn't a post
+        self.assertLess(feed.index("blog/ann.html"), feed.index("blog/tom/"))
+        self.assertEqual(feed.count("<entry>"), 2)
+
+    def test_incremental_build_updates_only_changed_entries(self):
+        self.build()
+        path = os.path.join(self.content, "blog", "ann.md")
+        self.write(path, "# Ann again\n\nJust two.")
+        manifest = self.build()
+        self.assertEqual(manifest.pages[path]["title"], "Ann again")
+        self.assertEqual(manifest.pages[path]["words"], 4)
+        self.assertEqual(manifest.pages[os.path.join(self.content, "index.md")]["title"], "Home & Away")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import io
+import unittest
+
+from template import Template, base_path_rewriter, minify_markup
+from htmlnode import LeafNode, ParentNode
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render_fills_slots(self):
+        template = Template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        self.assertEqual(
+            template.render(Title="Home", Content="<p>hi</p>"),
+            "<title>Home</title><article><p>hi</p></article>",
+        )
+
+    def test_base_path_applied_at_compile_time(self):
+        template = Template('<link href="/index.css" /><img src="/a.png" />{{ Content }}', "/site/")
+        self.assertEqual(
+            template.render(Content='<a href="/x">'),
+            '<link href="/site/index.css" /><img src="/site/a.png" /><a href="/x">',
+        )
+
+    def test_slot_values_are_not_rescanned(self):
+        template = Template("{{ Title }}|{{ Content }}")
+        self.assertEqual(template.render(Title="{{ Content }}", Content="x"), "{{ Content }}|x")
+
+    def test_content_rewritten_through_node_tree(self):
+        node = ParentNode("p", [
+            LeafNode("a", "home", {"href": "/"}),
+            LeafNode("code", 'href="/not-a-link"'),
+            LeafNode("a", "out", {"href": "https://example.com"}),
+        ])
+        self.assertEqual(
+            node.to_html(base_path_rewriter("/site/")),
+            '<p><a href="/site/">home</a><code>href="/not-a-link"</code><a href="https://example.com">out</a></p>',
+        )
+
+    def test_root_base_path_needs_no_rewriter(self):
+        self.assertIsNone(base_path_rewriter("/"))
+
+    def test_fingerprinted_asset_urls(self):
+        asset_urls = {"/index.css": "/index.0123456789.css"}
+        template = Template('<link href="/index.css" /><a href="/index.css.html">{{ Content }}', "/site/", asset_urls=asset_urls)
+        self.assertEqual(template.render(Content=""),
+                         '<link href="/site/index.0123456789.css" /><a href="/site/index.css.html">')
+        rewrite = base_path_rewriter("/", asset_urls)
+        self.assertEqual(rewrite("/index.css?v=2#top"), "/index.0123456789.css?v=2#top")
+        self.assertEqual(rewrite("index.css"), "index.css")
+
+    def test_minify_at_compile_time(self):
+        text = "<!doctype html>\n<html>\n  <head>\n    <title>{{ Title }}</title>\n  </head>\n" \
+               "  <body>\n    <article>{{ Content }}</article>\n    <pre>  keep\n  me</pre>\n  </body>\n</html>\n"
+        template = Template(text, minify=True)
+        node = ParentNode("p", [LeafNode("", "two  spaces")])
+        stream = io.StringIO()
+        template.write(stream, Title="Home", Content=node)
+        self.assertEqual(
+            stream.getvalue(),
+            "<!doctype html><html><head><title>Home</title></head><body>"
+            "<article><p>two spaces</p></article><pre>  keep\n  me</pre></body></html>",
+        )
+
+    def test_minify_keeps_inline_spacing(self):
+        self.assertEqual(minify_markup("<p>\n  <b>a</b>  <i>b</i>\n</p>"), "<p><b>a</b> <i>b</i></p>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import unittest
+from unittest import mock
+
+import watch
+from manifest import BuildManifest, MANIFEST_NAME
+from watch import DevSite, PollingWatcher
+from helpers import TempDirTestCase
+
+
+class TestWatch(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.dest = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(self.static)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.site = DevSite(self.content, self.template, self.static, self.dest)
+        self.site.build_all()
+
+    def read(self, *parts):
+        with open(os.path.join(self.dest, *parts)) as f:
+            return f.read()
+
+    def test_polling_watcher_reports_changes(self):
+        watcher = PollingWatcher([self.content, self.template])
+        self.assertEqual(watcher.changes(), [])
+        post = os.path.join(self.content, "blog", "post.md")
+        self.write(post, "# Post, edited")
+        os.remove(os.path.join(self.content, "index.md"))
+        self.assertEqual(watcher.changes(), sorted([post, os.path.join(self.content, "index.md")]))
+
+    def test_content_change_rebuilds_only_that_page(self):
+        post = os.path.join(self.content, "blog", "post.md")
+        self.write(post, "# Edited post")
+        with mock.patch.object(watch, "parse_page", wraps=watch.parse_page) as parse:
+            self.site.apply_changes([post])
+        self.assertEqual(parse.call_count, 1)
+        self.assertIn("Edited post", self.read("blog", "post.html"))
+
+    def test_bad_page_doesnt_stop_the_rest_of_the_batch(self):
+        index = os.path.join(self.content, "index.md")
+        post = os.path.join(self.content, "blog", "post.md")
+        self.write(index, "no title any more")
+        self.write(post, "# Edited post")
+        self.site.apply_changes([index, post])
+        self.assertIn("Edited post", self.read("blog", "post.html"))
+        manifest = BuildManifest.load(os.path.join(self.dest, MANIFEST_NAME))
+        self.assertEqual(manifest.pages[post]["title"], "Edited post")
+
+    def test_template_change_reuses_parsed_trees(self):
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        with mock.patch.object(watch, "parse_page") as parse:
+            self.site.apply_changes([self.template])
+        parse.assert_not_called()
+        self.assertTrue(self.read("index.html").startswith("<h1>Home</h1>"))
+
+    def test_deleted_page_output_is_removed(self):
+        post = os.path.join(self.content, "blog", "post.md")
+        os.remove(post)
+        self.site.apply_changes([post])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "post.html")))
+
+    def test_static_change_is_synced(self):
+        css = os.path.join(self.static, "index.css")
+        self.write(css, "body { margin: 0 }")
+        self.site.apply_changes([css])
+        self.assertEqual(self.read("index.css"), "body { margin: 0 }")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,264 @@
+import os
+import time
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # optional, polling is used without it
+    INotify = None
+
+from assets import sync_assets, fingerprinted_urls
+from generate_page import collect_pages, parse_page, write_page, template_inputs_hash
+from manifest import BuildManifest, MANIFEST_NAME, hash_file, remove_output
+from site_index import page_info, word_count
+from template import Template
+
+
+def snapshot(paths):
+    """
+    Returns {file path: (mtime, size)} for every file under the given files
+    and directories.
+    """
+    state = {}
+    for path in paths:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+            continue
+        for dirpath, _, filenames in os.walk(path):
+            for name in filenames:
+                file_path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:  # deleted while walking
+                    continue
+                state[file_path] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+class PollingWatcher:
+    """
+    Detects changes by comparing snapshots of the watched paths at a fixed
+    interval.
+    """
+
+    def __init__(self, paths, interval=0.5):
+        self.paths = paths
+        self.interval = interval
+        self.state = snapshot(paths)
+
+    def changes(self):
+        """
+        Returns the sorted paths added, modified or deleted since the last
+        call, and remembers the new state.
+        """
+        new_state = snapshot(self.paths)
+        changed = {path for path in self.state.keys() | new_state.keys()
+                   if self.state.get(path) != new_state.get(path)}
+        self.state = new_state
+        return sorted(changed)
+
+    def wait(self):
+        """
+        Blocks until something changes and returns the changed paths.
+        """
+        while True:
+            time.sleep(self.interval)
+            changed = self.changes()
+            if changed:
+                return changed
+
+
+class InotifyWatcher(PollingWatcher):
+    """
+    Sleeps on inotify events instead of polling, then works out what changed
+    with the same snapshot comparison.
+    """
+
+    def __init__(self, paths):
+        super().__init__(paths)
+        self.inotify = INotify()
+        self.mask = (flags.CREATE | flags.MODIFY | flags.DELETE | flags.CLOSE_WRITE |
+                     flags.MOVED_FROM | flags.MOVED_TO | flags.ATTRIB)
+        self._add_watches()
+
+    def _add_watches(self):
+        # inotify is not recursive: watch every directory, including new
+        # ones, and the parent of single files so editors that save by
+        # renaming over the file are still seen
+        for path in self.paths:
+            if os.path.isfile(path):
+                self.inotify.add_watch(os.path.dirname(path) or ".", self.mask)
+                continue
+            for dirpath, _, _ in os.walk(path):
+                self.inotify.add_watch(dirpath, self.mask)
+
+    def wait(self):
+        while True:
+            # read_delay lets a burst of events from one save settle
+            self.inotify.read(read_delay=50)
+            self._add_watches()
+            changed = self.changes()
+            if changed:
+                return changed
+
+
+def make_watcher(paths):
+    """
+    Returns an InotifyWatcher when inotify_simple is installed, else a
+    PollingWatcher.
+    """
+    if INotify is not None:
+        try:
+            return InotifyWatcher(paths)
+        except OSError:  # e.g. not on Linux, or out of watches
+            pass
+    return PollingWatcher(paths)
+
+
+def serve(directory, port):
+    """
+    Serves directory on http://localhost:port from a background thread and
+    returns the server.
+    """
+    handler = partial(SimpleHTTPRequestHandler, directory=directory)
+    server = ThreadingHTTPServer(("localhost", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class DevSite:
+    """
+    The state a watch session keeps warm between rebuilds: the compiled
+    template and the parsed tree of every page, so a change only re-renders
+    the outputs it affects and a template change re-renders every page
+    without parsing any markdown.
+    """
+
+    def __init__(self, content_dir, template_path, static_dir, dest_dir, base_path="/", asset_mode="copy",
+                 fingerprint=False, minify=False):
+        self.content_dir = content_dir
+        self.template_path = template_path
+        self.static_dir = static_dir
+        self.dest_dir = dest_dir
+        self.base_path = base_path
+        self.asset_mode = asset_mode
+        self.fingerprint = fingerprint
+        self.minify = minify
+        self.asset_urls = None
+        self.manifest = BuildManifest.load(os.path.join(dest_dir, MANIFEST_NAME))
+        self.template = None
+        self.template_hash = None
+        # markdown path -> (html path, title, html node, links)
+        self.pages = {}
+
+    def build_all(self):
+        self.sync_static()
+        self.load_template()
+        for source_path, html_dest_path in collect_pages(self.content_dir, self.dest_dir):
+            try:
+                self.render_page(source_path, html_dest_path)
+            except Exception as e:
+                # a broken page shouldn't stop the session starting; it is
+                # rebuilt when it is saved again
+                print(f"Failed to build {source_path}: {type(e).__name__}: {e}")
+        self.manifest.remove_stale_pages(list(self.pages), self.dest_dir)
+        self.manifest.save()
+
+    def load_template(self):
+        self.template = Template.from_file(self.template_path, self.base_path, self.asset_urls, self.minify)
+        self.template_hash = template_inputs_hash(self.template_path, self.asset_urls, self.minify)
+
+    def sync_static(self):
+        sync_assets(self.static_dir, self.dest_dir, self.manifest, self.asset_mode, self.fingerprint)
+        if self.fingerprint:
+            asset_urls = fingerprinted_urls(self.manifest, self.static_dir, self.dest_dir)
+            changed = asset_urls != self.asset_urls
+            self.asset_urls = asset_urls
+            # pages link to the fingerprinted names, which just changed
+            if changed and self.template is not None:
+                self.rerender_all()
+
+    def render_page(self, source_path, html_dest_path):
+        print(f"Generating page from {source_path} to {html_dest_path}")
+        links = []
+        title, html_node = parse_page(source_path, links=links)
+        self.pages[source_path] = (html_dest_path, title, html_node, links)
+        self.write(source_path)
+
+    def write(self, source_path):
+        html_dest_path, title, html_node, links = self.pages[source_path]
+        write_page(self.template, title, html_node, html_dest_path)
+        info = page_info(source_path, html_dest_path, self.dest_dir, title, word_count(html_node), links)
+        self.manifest.record_page(source_path, hash_file(source_path), self.template_hash,
+                                  self.base_path, html_dest_path, info)
+
+    def rerender_all(self):
+        """
+        Rewrites every page from its cached tree, e.g. after a template change.
+        """
+        self.load_template()
+        for source_path in sorted(self.pages):
+            self.write(source_path)
+        print(f"Re-rendered {len(self.pages)} pages from cached trees.")
+
+    def apply_changes(self, changed):
+        """
+        Rebuilds the outputs affected by the changed paths.
+        """
+        content_changed = [path for path in changed if _is_under(path, self.content_dir)]
+        try:
+            if any(_is_under(path, self.static_dir) for path in changed):
+                self.sync_static()
+            if self.template_path in changed:
+                self.rerender_all()
+
+            if content_changed:
+                current = dict(collect_pages(self.content_dir, self.dest_dir))
+                for path in content_changed:
+                    if path in current:
+                        try:
+                            self.render_page(path, current[path])
+                        except Exception as e:
+                            # the watcher won't report this change again, so
+                            # the rest of the batch must still be built
+                            print(f"Failed to build {path}: {type(e).__name__}: {e}")
+                    elif path in self.pages:
+                        html_dest_path = self.pages.pop(path)[0]
+                        self.manifest.pages.pop(path, None)
+                        remove_output(html_dest_path, self.dest_dir)
+        finally:
+            self.manifest.save()
+
+
+def _is_under(path, directory):
+    return os.path.commonpath([os.path.abspath(path), os.path.abspath(directory)]) == os.path.abspath(directory)
+
+
+def watch_site(content_dir, template_path, static_dir, dest_dir, base_path="/", port=8888, asset_mode="copy",
+               fingerprint=False, minify=False):
+    """
+    Builds the site, serves dest_dir on http://localhost:port and rebuilds
+    whatever is affected each time content, static files or the template
+    change. Runs until interrupted.
+    """
+    site = DevSite(content_dir, template_path, static_dir, dest_dir, base_path, asset_mode, fingerprint, minify)
+    site.build_all()
+    server = serve(dest_dir, port)
+    watcher = make_watcher([content_dir, static_dir, template_path])
+    print(f"Serving '{dest_dir}' on http://localhost:{port} and watching for changes "
+          f"({type(watcher).__name__}). Press Ctrl+C to stop.")
+    try:
+        while True:
+            changed = watcher.wait()
+            print(f"Changed: {', '.join(changed)}")
+            try:
+                site.apply_changes(changed)
+            except Exception as e:
+                print(f"Rebuild failed: {type(e).__name__}: {e}")
+    except KeyboardInterrupt:
+        print("Stopping.")
+    finally:
+        server.shutdown()